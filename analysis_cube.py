@@ -0,0 +1,145 @@
+# analysis_cube.py
+"""
+分析タブ用の集計キューブ。
+(エリア, 潮回り, 月, ルアー, ベイト) ごとに 釣行数・釣果数・サイズ合計・サイズ件数 を持っておき、
+追加・更新・削除は data_cache の変更通知から差分で反映する（全件の集計し直しは変更内容が分からないときだけ）。
+各ブロックはこのキューブを絞り込んで groupby するだけなので、元の行数に関係なく軽い。
+（潮位 × 時間帯ヒートマップは刻みを自由に変えられるよう、行ごとの値から tide_heatmap で数える）
+"""
+from __future__ import annotations
+
+import threading
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+from db_backend import fetch_all
+from log_schema import COLUMNS, month_labels, to_df
+
+DIMENSIONS = ["area", "tide_type", "month", "lure", "bait_pattern"]
+# size_sum / size_cnt は釣れた（size > 0）行だけ
+MEASURES = ["trips", "catches", "size_sum", "size_cnt"]
+
+_lock = threading.Lock()
+_cells: dict[tuple, np.ndarray] = {}
+_version: Optional[int] = None
+_frame: Optional[pd.DataFrame] = None  # _cells を DataFrame にしたもの（_version のとき有効）
+_stats = {"rebuilds": 0, "incremental": 0, "applied_changes": 0}
+
+
+def _keys(df: pd.DataFrame) -> pd.DataFrame:
+    """行 → 集計キー＋行ごとの集計値。日付が読めない行は集計対象外（従来の _prep_df と同じ）"""
+    df = df[df["date_dt"].notna()]
+    size = pd.to_numeric(df["size"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    caught = size > 0
+
+    return pd.DataFrame({
+        "area": df["area"].fillna("未入力").to_numpy(),
+        "tide_type": df["tide_type"].fillna("不明").to_numpy(),
+        "month": month_labels(df["date_dt"]),
+        "lure": df["lure"].fillna("").to_numpy(),
+        "bait_pattern": df["bait_pattern"].fillna("その他/不明").to_numpy(),
+        "trips": np.ones(len(df)),
+        "catches": caught.astype(float),
+        "size_sum": np.where(caught, size, 0.0),
+        "size_cnt": caught.astype(float),
+    })
+
+
+def _aggregate(df: pd.DataFrame) -> dict[tuple, np.ndarray]:
+    if df.empty:
+        return {}
+    g = _keys(df).groupby(DIMENSIONS, sort=False)[MEASURES].sum()
+    return dict(zip(g.index, g.to_numpy()))
+
+
+def _records_df(records: list[dict]) -> pd.DataFrame:
+    return to_df([[r.get(c) for c in COLUMNS] for r in records])
+
+
+def _apply(changes: list[data_cache.Change]) -> None:
+    """変更前のレコードを引き、変更後のレコードを足す"""
+    for records, sign in (([old for old, _ in changes if old is not None], -1.0),
+                          ([new for _, new in changes if new is not None], 1.0)):
+        for key, vals in _aggregate(_records_df(records)).items():
+            cur = _cells.get(key)
+            cur = vals * sign if cur is None else cur + vals * sign
+            if cur[0] <= 0:
+                _cells.pop(key, None)
+            else:
+                _cells[key] = cur
+
+
+def _rebuild() -> None:
+    """
+    全件から作り直す。読み込み中に書き込みがあったら読み直す（差分を二重に足さないため）。
+    書き込み側はコミットと bump_version を同じロックの中で行うので、
+    読み込みの前後でバージョンが同じなら、読んだ行にそれ以降の変更は入っていない
+    """
+    global _cells, _version
+    for _ in range(3):
+        v = data_cache.data_version()
+        cells = _aggregate(fetch_all())
+        if data_cache.data_version() == v:
+            _cells, _version = cells, v
+            _stats["rebuilds"] += 1
+            return
+    # 書き込みが続いている → 今回の結果は使うが、次回も作り直す
+    _cells, _version = cells, None
+    _stats["rebuilds"] += 1
+
+
+def _to_frame(cells: dict[tuple, np.ndarray]) -> pd.DataFrame:
+    if not cells:
+        return pd.DataFrame({c: pd.Series(dtype=object) for c in DIMENSIONS}
+                            | {c: pd.Series(dtype=float) for c in MEASURES})
+    keys = list(cells)
+    out = pd.DataFrame.from_records(keys, columns=DIMENSIONS)
+    out[MEASURES] = np.vstack([cells[k] for k in keys])
+    return out
+
+
+class Cube(NamedTuple):
+    frame: pd.DataFrame  # 1行 = 1セル、列は DIMENSIONS + MEASURES
+    version: Optional[int]  # frame が反映しているデータバージョン（書き込みが続いて決まらなかったら None）
+
+
+def get_cube() -> Cube:
+    """
+    現在のデータバージョンのキューブと、それが反映しているバージョン。
+    キューブから作った結果を使い回すときは、取った後に進んだかもしれない data_version() ではなくこの version で管理する。
+    frame は共有オブジェクトなので、書き換える場合はコピーすること。
+    """
+    global _version, _frame
+    with _lock:
+        if _version is None:
+            _rebuild()
+            _frame = None
+        else:
+            current, changes = data_cache.changes_since(_version)
+            if changes is None:
+                _rebuild()
+                _frame = None
+            elif current != _version:
+                _apply(changes)
+                _version = current
+                _frame = None
+                _stats["incremental"] += 1
+                _stats["applied_changes"] += len(changes)
+        if _frame is None:
+            _frame = _to_frame(_cells)
+        return Cube(_frame, _version)
+
+
+def slice_cube(cube: pd.DataFrame, area: Optional[str] = None) -> pd.DataFrame:
+    """エリアで絞り込む（None は全エリア）"""
+    if area is None:
+        return cube
+    return cube[cube["area"] == area]
+
+
+def cube_stats() -> dict:
+    with _lock:
+        return {"version": _version, "cells": len(_cells), **_stats}
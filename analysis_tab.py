@@ -2,13 +2,17 @@
 import pandas as pd
 import plotly.express as px
 import streamlit as st
-# from db_utils import fetch_all
 import numpy as np
-from db_utils_gsheets import fetch_all
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
 
-# 東京湾向けの潮位レンジ設定
-TIDE_MAX_CM  = 220.0   # 上限（これ以上は最後のビンにまとめる）
-TIDE_STEP_CM = 20.0    # 刻み（細かめ）
+import data_cache
+from perf import timed
+from analysis_cube import get_cube, slice_cube
+from db_backend import fetch_all
+from log_schema import month_labels
+import tide_heatmap as th
 
 def render_tap_only(fig, key=None):
     fig.update_layout(dragmode=False, hovermode="closest")
@@ -28,26 +32,144 @@ def render_tap_only(fig, key=None):
         },
     )
 
-def _prep_df():
-    df = fetch_all()
+class PreparedLog(NamedTuple):
+    df: pd.DataFrame                   # 分析用に整えた全行（日付が読めない行は除外済み）
+    area_rows: dict[str, np.ndarray]   # エリア → df の行位置
+    version: int = 0                   # 読み込む前のデータバージョン（これ以降の書き込みは入っていないかもしれない）
+
+def _prepare(df: pd.DataFrame, version: int = 0) -> PreparedLog:
     if df.empty:
-        return df
-    # 日付→月、サイズ→キャッチ有無
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date"])
-    df["month"] = df["date"].dt.to_period("M").astype(str)
-    df["size"] = pd.to_numeric(df["size"], errors="coerce")
+        return PreparedLog(df, {}, version)
+    # 日付→月、サイズ→キャッチ有無（date は fetch_all で date_dt にパース済み）
+    df = df[df["date_dt"].notna()].copy()
+    df["date"] = df["date_dt"]
+    df["month"] = month_labels(df["date_dt"])
     df["caught"] = df["size"].fillna(0) > 0
     # 欠損の扱いを軽く整理
     df["tide_type"] = df["tide_type"].fillna("不明")
     df["area"] = df["area"].fillna("未入力")
     df["bait_pattern"] = df["bait_pattern"].fillna("その他/不明") # 👈 追加
-    return df
-
-def _summary_block(df):
-    total = len(df)
-    catches = int(df["caught"].sum())
+    # ヒートマップ用（潮位は cm に正規化、時刻は時。無効値は NaN / -1）
+    df["tide_cm"] = th.tide_cm(df["tide_height"])
+    df["hour"] = th.hours(df["time"], df["time_dt"])
+    df = df.reset_index(drop=True)
+
+    # エリア → 行位置（エリアの切り替えを全行のマスクではなく添字で引く）
+    codes, uniq = pd.factorize(df["area"], sort=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniq) + 1))
+    area_rows = {a: order[bounds[i]:bounds[i + 1]] for i, a in enumerate(uniq)}
+    return PreparedLog(df, area_rows, version)
+
+@timed("analysis.prepare")
+def _prep_log() -> PreparedLog:
+    # データバージョンごとに1回だけ作る（共有オブジェクトなので書き換えないこと）
+    return data_cache.get_or_load("analysis.prepared", _load_prepared)
+
+def _load_prepared() -> PreparedLog:
+    # バージョンは読む前に取る（読んでいる間の書き込みを、入っているものとして扱わない）
+    v = data_cache.data_version()
+    return _prepare(fetch_all(), v)
+
+def _area_df(log: PreparedLog, area: Optional[str]) -> pd.DataFrame:
+    """エリアで絞り込んだ行（None は全エリア）"""
+    if area is None:
+        return log.df
+    return log.df.take(log.area_rows.get(area, np.empty(0, dtype=np.intp)))
+
+def _avg_size(g):
+    # 釣れた魚の平均サイズ（釣果なしは None）
+    return (g["size_sum"] / g["size_cnt"]).where(g["size_cnt"] > 0)
+
+# ===== 各ブロックの集計（UI に依存しない。bench からも呼ぶ） =====
+
+def _summary_agg(cube):
+    total = int(cube["trips"].sum())
+    catches = int(cube["catches"].sum())
     rate = (catches / total * 100) if total else 0.0
+    return total, catches, rate
+
+def _tide_agg(cube):
+    g = cube.groupby("tide_type")[["trips", "catches"]].sum().reset_index()
+    g["catch_rate"] = (g["catches"] / g["trips"] * 100).round(1)
+    # 表示順（よく使う順）に並べ替え
+    order = ["大潮", "中潮", "小潮", "若潮", "長潮", "不明"]
+    g["order_key"] = g["tide_type"].apply(lambda x: order.index(x) if x in order else len(order))
+    return g.sort_values(["order_key"])
+
+def _month_agg(cube):
+    g = cube.groupby("month")[["trips", "catches", "size_sum", "size_cnt"]].sum().reset_index()
+    g["avg_size"] = _avg_size(g)
+    g["catch_rate"] = (g["catches"] / g["trips"] * 100).round(1)
+    # 月を時系列順に
+    g["month_dt"] = pd.to_datetime(g["month"], format="%Y-%m")
+    return g.sort_values("month_dt")
+
+def _lure_agg(c_catch):
+    """c_catch は釣果のあるセルだけのキューブ"""
+    g = c_catch.groupby("lure")[["catches", "size_sum", "size_cnt"]].sum().reset_index()
+    g["avg_size"] = _avg_size(g)
+    return g[["lure", "catches", "avg_size"]].sort_values("catches", ascending=False)
+
+def _bait_lure_agg(c_catch):
+    """(ベイト × ルアーの釣果数, ルアー × ベイトのクロス集計表)"""
+    c_catch = c_catch.copy()
+    # 空白データの処理（ベイトの欠損はキューブ側で「その他/不明」に寄せてある）
+    c_catch["lure"] = c_catch["lure"].replace("", "未入力")
+
+    g = c_catch.groupby(["bait_pattern", "lure"])["catches"].sum().astype(int).reset_index()
+    pivot_df = g.pivot_table(
+        index="lure", 
+        columns="bait_pattern", 
+        values="catches", 
+        aggfunc="sum", 
+        fill_value=0
+    )
+    # 見やすいように釣果が多いルアー順にソート
+    pivot_df["総計"] = pivot_df.sum(axis=1)
+    pivot_df = pivot_df.sort_values("総計", ascending=False).drop(columns=["総計"])
+    return g, pivot_df
+
+
+# ===== 表示 =====
+
+# ブロックの集計結果の LRU（(ブロック, エリア, 設定) → (元データのバージョン, 結果)）。
+# 設定の組み合わせ（ヒートマップの刻み・上限など）はいくらでも増えるので件数で抑える
+AGG_CACHE_SIZE = 64
+_agg_lock = threading.Lock()
+_agg_cache: OrderedDict[tuple, tuple[int, object]] = OrderedDict()
+
+def _memo(block: str, area, version: Optional[int], compute, *params):
+    """
+    ブロックの集計結果を (ブロック, エリア, 設定) ごとに、元データ（キューブ・行）のバージョン単位で使い回す。
+    version は compute が読むデータのバージョン（get_cube / _prep_log の返り値のもの）。
+    今のデータバージョンを使うと、データを取った後の書き込みで古い集計が新しい版として残ってしまう。
+    開き直したときや他のブロックを操作した rerun では計算し直さない。共有オブジェクトなので書き換えないこと。
+    グラフ（Plotly の Figure）は入れない：描画時に書き換えるので、rerun ごとに作る
+    """
+    if version is None:  # どの版か分からないデータ（書き込み中に作ったキューブ）は使い回さない
+        return compute()
+    key = (block, area, params)
+    with _agg_lock:
+        hit = _agg_cache.get(key)
+        if hit is not None and hit[0] == version:
+            _agg_cache.move_to_end(key)
+            return hit[1]
+    value = compute()
+    with _agg_lock:
+        _agg_cache[key] = (version, value)
+        _agg_cache.move_to_end(key)
+        while len(_agg_cache) > AGG_CACHE_SIZE:
+            _agg_cache.popitem(last=False)
+    return value
+
+def _area_list() -> list[str]:
+    # キューブのセルから作るので、行データ（_prep_log）を用意しなくても選択肢が出せる
+    return data_cache.get_or_load("analysis.areas", lambda: sorted(get_cube().frame["area"].unique().tolist()))
+
+@timed("analysis.summary")
+def _summary_block(cube, version, area=None):
+    total, catches, rate = _memo("summary", area, version, lambda: _summary_agg(cube))
 
     st.subheader("📊 釣行サマリー")
     c1, c2, c3 = st.columns(3)
@@ -55,20 +177,14 @@ def _summary_block(df):
     c2.metric("釣れた回数", f"{catches}")
     c3.metric("キャッチ率", f"{rate:.1f}%")
 
-def _tide_block(df):
+@timed("analysis.tide")
+def _tide_block(cube, version, area=None):
     st.subheader("🌊 潮回り別の傾向（キャッチ率）")
-    if df.empty:
+    if cube.empty:
         st.info("データがありません。")
         return
-    g = df.groupby("tide_type").agg(
-        trips=("id", "count"),
-        catches=("caught", "sum"),
-    ).reset_index()
-    g["catch_rate"] = (g["catches"] / g["trips"] * 100).round(1)
-    # 表示順（よく使う順）に並べ替え
-    order = ["大潮", "中潮", "小潮", "若潮", "長潮", "不明"]
-    g["order_key"] = g["tide_type"].apply(lambda x: order.index(x) if x in order else len(order))
-    g = g.sort_values(["order_key"])
+
+    g = _memo("tide", area, version, lambda: _tide_agg(cube))
 
     fig = px.bar(
         g, x="tide_type", y="catch_rate",
@@ -106,36 +222,30 @@ def _tide_block(df):
         columns={"tide_type": "潮回り", "trips": "釣行数", "catches": "ヒット回数", "catch_rate": "キャッチ率（%）"}
     ))
 
-def _month_block(df):
+@timed("analysis.month")
+def _month_block(cube, version, area=None):
     st.subheader("📆 月別の傾向（釣行回数・キャッチ率）")
-    if df.empty:
+    if cube.empty:
         st.info("データがありません。")
         return
-    g = df.groupby("month").agg(
-        trips=("id", "count"),
-        catches=("caught", "sum"),
-        avg_size=("size", lambda x: x[x > 0].mean() if (x > 0).any() else None),
-    ).reset_index()
-    g["catch_rate"] = (g["catches"] / g["trips"] * 100).round(1)
-    # 月を時系列順に
-    g["month_dt"] = pd.to_datetime(g["month"], format="%Y-%m")
-    g = g.sort_values("month_dt")
+
+    g = _memo("month", area, version, lambda: _month_agg(cube))
+    fig1 = px.bar(
+        g, x="month", y="trips",
+        labels={"month": "月", "trips": "釣行回数"},
+        title="月別 釣行回数"
+    )
+    fig2 = px.line(
+        g, x="month", y="catch_rate", markers=True,
+        labels={"month": "月", "catch_rate": "キャッチ率（%）"},
+        title="月別 キャッチ率"
+    )
 
     c1, c2 = st.columns(2)
     with c1:
-        fig1 = px.bar(
-            g, x="month", y="trips",
-            labels={"month": "月", "trips": "釣行回数"},
-            title="月別 釣行回数"
-        )
         render_tap_only(fig1)
 
     with c2:
-        fig2 = px.line(
-            g, x="month", y="catch_rate", markers=True,
-            labels={"month": "月", "catch_rate": "キャッチ率（%）"},
-            title="月別 キャッチ率"
-        )
         render_tap_only(fig2)
 
 
@@ -145,24 +255,22 @@ def _month_block(df):
         .rename(columns={"month": "月", "trips": "釣行数", "catches": "ヒット回数", "catch_rate": "キャッチ率（%）", "avg_size": "平均サイズ(cm)"})
     )
 
-def _lure_block(df):
+@timed("analysis.lure")
+def _lure_block(cube, version, area=None):
     st.subheader("🪝 ルアー別の釣果")
 
-    if df.empty:
+    if cube.empty:
         st.info("データがありません。")
         return
 
     # サイズ0（ボウズ）は除外
-    df_catch = df[df["size"] > 0]
+    c_catch = cube[cube["catches"] > 0]
 
-    if df_catch.empty:
+    if c_catch.empty:
         st.info("まだ釣果データがありません。")
         return
 
-    g = df_catch.groupby("lure").agg(
-        catches=("id", "count"),
-        avg_size=("size", "mean")
-    ).reset_index().sort_values("catches", ascending=False)
+    g = _memo("lure", area, version, lambda: _lure_agg(c_catch))
 
     # --- グラフ1：使用ルアー別の釣果回数 ---
     fig1 = px.bar(
@@ -173,10 +281,7 @@ def _lure_block(df):
         labels={"lure": "ルアー", "catches": "釣果数"},
         title="ルアー別の釣果数"
     )
-
     fig1.update_traces(texttemplate="%{text}", textposition="outside")
-    render_tap_only(fig1)
-
 
     # --- グラフ2：ルアー別の平均サイズ ---
     fig2 = px.bar(
@@ -189,8 +294,8 @@ def _lure_block(df):
         color="avg_size",
         color_continuous_scale="Viridis"
     )
-
     fig2.update_traces(texttemplate="%{text:.1f}", textposition="outside")
+    render_tap_only(fig1)
     render_tap_only(fig2)
 
 
@@ -204,26 +309,23 @@ def _lure_block(df):
         use_container_width=True
     )
 
-def _bait_lure_cross_block(df):
+@timed("analysis.bait_lure")
+def _bait_lure_cross_block(cube, version, area=None):
     st.subheader("🐟 ベイト × ルアーの最強コンボ")
 
-    if df.empty:
+    if cube.empty:
         st.info("データがありません。")
         return
 
     # ボウズ（サイズ0や未入力）は除外
-    df_catch = df[df["size"] > 0].copy()
+    c_catch = cube[cube["catches"] > 0]
 
-    if df_catch.empty:
+    if c_catch.empty:
         st.info("まだ釣果データがありません。")
         return
 
-    # 空白データの処理
-    df_catch["bait_pattern"] = df_catch["bait_pattern"].fillna("その他/不明")
-    df_catch["lure"] = df_catch["lure"].fillna("未入力").replace("", "未入力")
-
-    # ① グラフ用データ：ベイト × ルアー で集計
-    g = df_catch.groupby(["bait_pattern", "lure"]).size().reset_index(name="catches")
+    # ① グラフ用データ：ベイト × ルアー で集計（② のクロス集計表も一緒に作る）
+    g, pivot_df = _memo("bait_lure", area, version, lambda: _bait_lure_agg(c_catch))
 
     # 積み上げ棒グラフの作成
     fig = px.bar(
@@ -243,21 +345,10 @@ def _bait_lure_cross_block(df):
 
     # ② クロス集計表（表形式でパッと見たい時用）
     st.markdown("**📈 ルアー × ベイト クロス集計表**")
-    pivot_df = df_catch.pivot_table(
-        index="lure", 
-        columns="bait_pattern", 
-        values="id", 
-        aggfunc="count", 
-        fill_value=0
-    )
-    
-    # 見やすいように釣果が多いルアー順にソート
-    pivot_df["総計"] = pivot_df.sum(axis=1)
-    pivot_df = pivot_df.sort_values("総計", ascending=False).drop(columns=["総計"])
-    
     st.dataframe(pivot_df, use_container_width=True)
 
-def _area_tide_block(df):
+@timed("analysis.area_tide")
+def _area_tide_block(df, version, area=None):
     st.subheader("📍 エリア別の潮位分布")
 
     if df.empty:
@@ -265,8 +356,7 @@ def _area_tide_block(df):
         return
 
     # サイズ0（ボウズ）は除外
-    df_catch = df[df["size"] > 0].dropna(subset=["tide_height"])
-
+    df_catch = _memo("area_tide", area, version, lambda: df[df["size"] > 0].dropna(subset=["tide_height"]))
     if df_catch.empty:
         st.info("潮位データのある釣果がありません。")
         return
@@ -296,95 +386,54 @@ def _area_tide_block(df):
 
     render_tap_only(fig)
 
-def _tide_time_heatmap(df):
+# ヒートマップの指標（tide_heatmap.METRICS のキー → 選択肢の表示名）
+_HEATMAP_METRICS = {"count": "釣果数", "mean": "平均サイズ", "max": "最大サイズ", "catch_rate": "キャッチ率"}
+
+@timed("analysis.heatmap")
+def _tide_time_heatmap(df, version, area=None):
     st.subheader("⏰ 潮位 × 時間帯 ヒートマップ")
 
     if df.empty:
         st.info("データがありません。")
         return
 
-    # --- 1) 前処理：ボウズ除外 / 潮位・時間の欠損/ダミー除外 ---
-    d = df.copy()
-
-    # 釣れたときだけを見る（ヒット傾向を出したい前提）
-    d = d[pd.to_numeric(d["size"], errors="coerce").fillna(0) > 0]
-
-    # 潮位：数値化→欠損除外
-    d["tide_height"] = pd.to_numeric(d["tide_height"], errors="coerce")
-    d = d.dropna(subset=["tide_height"])
-
-    # “m”入力の可能性をcmに正規化（<=5をmとみなす）
-    m_mask = d["tide_height"].between(0.1, 5, inclusive="both")
-    d.loc[m_mask, "tide_height"] = d.loc[m_mask, "tide_height"] * 100
-
-    # 時間：文字列 "HH:MM" → datetime → hour
-    # 00:00 は“空欄代替”として扱って除外（必要なら残してもOK）
-    t = pd.to_datetime(d["time"], format="%H:%M", errors="coerce")
-    d = d[~((d["time"] == "00:00") | t.isna())].copy()
-    d["hour"] = t.dt.hour
-
-    if d.empty:
+    tide = df["tide_cm"].to_numpy()
+    hour = df["hour"].to_numpy()
+    if not _memo("heatmap_valid", area, version, lambda: bool(((hour >= 0) & ~np.isnan(tide)).any())):
         st.info("潮位と時間の有効データがありません。")
         return
 
-    # --- 2) 設定UI：時間帯の粒度・色指標 ---
+    # --- 1) 設定UI：潮位・時間帯の刻み、色指標 ---
     c1, c2 = st.columns(2)
     with c1:
-        hour_step = st.selectbox("時間帯の粒度", [1, 2, 3], index=1, help="1=1時間刻み、2=2時間刻み…")
+        hour_step = st.selectbox("時間帯の粒度", [1, 2, 3, 4, 6], index=1, help="1=1時間刻み、2=2時間刻み…")
     with c2:
-        metric = st.selectbox("色で表示する指標", ["釣果数", "平均サイズ"], index=0)
-
-    # 時間帯ビン（例：0-2, 2-4…）
-    d["hour_bin_start"] = (d["hour"] // hour_step) * hour_step
-    d["hour_bin_end"] = d["hour_bin_start"] + hour_step
-    d["hour_bin"] = d["hour_bin_start"].astype(str) + "–" + d["hour_bin_end"].astype(str) + "時"
-
-    # --- 2-b) 潮位ビン（東京湾向け：0〜220cmを20cm刻みで固定） ---
-    # 入力が上限を超えていても、最後のビンに“丸める”ためにクリップ
-    d["tide_h_cm"] = d["tide_height"].clip(lower=0, upper=TIDE_MAX_CM - 1e-6)
-
-    edges  = np.arange(0.0, TIDE_MAX_CM + 1e-6, TIDE_STEP_CM)  # 0,20,40,...,220
-    labels = [f"{int(edges[i])}–{int(edges[i+1])}cm" for i in range(len(edges)-1)]
-
-    d["tide_bin"] = pd.cut(
-        d["tide_h_cm"],
-        bins=edges,
-        right=False,           # 左閉右開 [a,b)
-        labels=labels,
-        include_lowest=True
-    )
-
-    # 念のため空判定
-    if d["tide_bin"].isna().all():
-        st.info("潮位ビンに該当するデータがありません。")
-        return
-
-    # --- 3) 集計 ---
-    if metric == "釣果数":
-        pivot = d.pivot_table(index="tide_bin", columns="hour_bin", values="id", aggfunc="count", fill_value=0)
-        color_title = "釣果数"
-    else:
-        # 釣れた魚の平均サイズ（cm）
-        pivot = d.pivot_table(index="tide_bin", columns="hour_bin", values="size", aggfunc="mean")
-        color_title = "平均サイズ (cm)"
-
-    # 軸の並びを自然順に（時間ビンを時間順で）
-    # hour_binの開始時刻でソート
-    def _hour_key(lbl):
-        try:
-            return int(lbl.split("–")[0])
-        except Exception:
-            return 0
-    cols_sorted = sorted(pivot.columns, key=_hour_key)
-    pivot = pivot[cols_sorted]
-
-    # --- 4) 可視化 ---
+        metric = st.selectbox("色で表示する指標", list(_HEATMAP_METRICS), index=0,
+                              format_func=_HEATMAP_METRICS.get)
+    c3, c4 = st.columns(2)
+    with c3:
+        tide_step = st.selectbox("潮位の刻み (cm)", [10, 20, 25, 50], index=1)
+    with c4:
+        tide_max = st.number_input("潮位の上限 (cm)", min_value=50, max_value=400,
+                                   value=int(th.DEFAULT_TIDE_MAX_CM), step=10,
+                                   help="これ以上は最後のビンにまとめる")
+
+    # --- 2) 集計：整数のビン番号で一度に数える ---
+    pivot = _memo("heatmap", area, version, lambda: th.tide_hour_grid(
+        tide, hour, df["size"].to_numpy(dtype=float, na_value=np.nan),
+        tide_step=float(tide_step), tide_max=float(tide_max), hour_step=hour_step, metric=metric,
+    ), tide_step, tide_max, hour_step, metric)
+    color_title = th.METRICS[metric]
+    title = ("潮位 × 時間帯 ヒートマップ（釣行全体に対するキャッチ率）" if metric == "catch_rate"
+             else "潮位 × 時間帯 ヒートマップ（釣れたデータのみ）")
+
+    # --- 3) 可視化 ---
     fig = px.imshow(
         pivot,
         aspect="auto",
         color_continuous_scale="YlOrRd",
         labels=dict(x="時間帯", y="潮位帯", color=color_title),
-        title="潮位 × 時間帯 ヒートマップ（釣れたデータのみ）"
+        title=title
     )
 
     # スマホ見切れ対策（上下左右余白）
@@ -398,29 +447,59 @@ def _tide_time_heatmap(df):
     st.dataframe(pivot.fillna(0).astype(float).round(1), use_container_width=True)
 
 
+# サマリー以外のセクション（キー → 表示名）。選んだものだけ集計・描画する
+SECTIONS = {
+    "tide": "🌊 潮回り",
+    "month": "📆 月別",
+    "lure": "🪝 ルアー",
+    "bait_lure": "🐟 ベイト×ルアー",
+    "area_tide": "📍 潮位分布",
+    "heatmap": "⏰ 潮位×時間帯",
+}
+
+@timed("analysis.render")
 def show_analysis():
     st.title("🎣 シーバス釣行ログ管理アプリ")
     st.caption("各要素の分析")
     st.divider()
     st.header("📈 分析")
-    df = _prep_df()
+    cube, version = get_cube()
 
     # --- エリアフィルタ（“全エリア”も選べる） ---
-    areas = ["全エリア"] + sorted(df["area"].dropna().unique().tolist()) if not df.empty else ["全エリア"]
-    sel = st.selectbox("エリア", areas, index=0)
-    if sel != "全エリア" and not df.empty:
-        df = df[df["area"] == sel]
+    sel = st.selectbox("エリア", ["全エリア"] + _area_list(), index=0)
+    area = None if sel == "全エリア" else sel
+    cube = slice_cube(cube, area)
 
-    if df.empty:
+    if cube.empty:
         st.info("まだデータがありません。まずは釣行を登録してください。")
         return
 
-    _summary_block(df)
+    _summary_block(cube, version, area)
     st.divider()
-    _tide_block(df)
-    st.divider()
-    _month_block(df)
-    _lure_block(df)
-    _bait_lure_cross_block(df)
-    _area_tide_block(df)
-    _tide_time_heatmap(df)
+
+    # スマホでは全部は見ないので、開いたセクションだけ計算する（結果はデータバージョンごとに保持）
+    opened = st.pills(
+        "見たい分析を選ぶ", list(SECTIONS), format_func=SECTIONS.get,
+        selection_mode="multi", default=[], key="analysis_sections",
+    ) or []
+
+    for key in SECTIONS:
+        if key not in opened:
+            continue
+        if key == "tide":
+            _tide_block(cube, version, area)
+        elif key == "month":
+            _month_block(cube, version, area)
+        elif key == "lure":
+            _lure_block(cube, version, area)
+        elif key == "bait_lure":
+            _bait_lure_cross_block(cube, version, area)
+        else:
+            # 箱ひげ図（実データの点）とヒートマップ（刻みを自由に変える）は行のまま使う
+            log = _prep_log()
+            area_df = _area_df(log, area)
+            if key == "area_tide":
+                _area_tide_block(area_df, log.version, area)
+            else:
+                _tide_time_heatmap(area_df, log.version, area)
+        st.divider()
@@ -0,0 +1,2 @@
+# bench/__init__.py
+# ヘッドレスで動かすベンチマーク（python -m bench.<name> で実行）
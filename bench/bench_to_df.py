@@ -0,0 +1,59 @@
+# bench/bench_to_df.py
+"""
+log_schema.to_df（シート・ミラーの値の DataFrame 化）のパース速度（rows/sec）を計測する。
+
+    python -m bench.bench_to_df
+"""
+from __future__ import annotations
+
+import time
+
+import pandas as pd
+
+from bench.synth import synthetic_rows
+from log_schema import COLUMNS, to_df
+
+SIZES = [1_000, 10_000, 100_000]
+REPEAT = 3
+
+
+def _to_df_rowwise(rows: list[list[str]]) -> pd.DataFrame:
+    """比較用：以前の1行ずつ詰め直す実装"""
+    col_count = len(COLUMNS)
+    normalized_rows = []
+    for r in rows:
+        if len(r) < col_count:
+            r = r + [""] * (col_count - len(r))
+        elif len(r) > col_count:
+            r = r[:col_count]
+        normalized_rows.append(r)
+    df = pd.DataFrame(normalized_rows, columns=COLUMNS)
+    df["id"] = pd.to_numeric(df["id"], errors="coerce").astype("Int64")
+    for col in ["tide_height", "temperature", "size"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    # 以前は利用側（分析・編集タブ）でそれぞれ日付・時刻をパースしていた
+    pd.to_datetime(df["date"], errors="coerce")
+    pd.to_datetime(df["time"], format="%H:%M", errors="coerce")
+    return df
+
+
+def _best_of(fn, rows) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    print(f"{'rows':>8} {'columnar rows/s':>16} {'row-wise rows/s':>16}")
+    for n in SIZES:
+        rows = synthetic_rows(n)
+        t_new = _best_of(to_df, rows)
+        t_old = _best_of(_to_df_rowwise, rows)
+        print(f"{n:>8} {n / t_new:>16,.0f} {n / t_old:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# bench/hot_paths.py
+"""
+合成ログ（bench.synth）で、ログが増えたときに重くなる処理を UI なしで計測し、結果を JSON で出す。
+コミット間で JSON を見比べれば遅くなった処理が分かる。
+
+    python -m bench.hot_paths                         # 1k / 10k / 100k 行
+    python -m bench.hot_paths --sizes 1000 1000000 --out bench_result.json
+
+各ケースは repeat 回実行して best_ms / median_ms を記録する（1回目の前に1回空打ちする）。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date as Date, datetime, time as Time, timedelta, timezone
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+import analysis_cube
+import analysis_tab
+import edit_tab
+import tide_heatmap
+import tide_store
+from bench.synth import synthetic_rows
+from log_schema import to_df
+from tide736 import TIDE736_PORTS, get_tide_height_for_time, interp_days
+from tide_store import parse_chart
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_REPEAT = 3
+
+# 潮位の一括補間（過去の記録の埋め戻しを想定：TIDE_DAYS 日分の系列から TIDE_LOOKUPS 件）
+TIDE_LOOKUPS = 100_000
+TIDE_DAYS = 365
+# 1件ずつの潮位（記録の追加・編集と同じ経路：ストアから1日分を読んで補間）。1件ごとに SQLite を読むので件数は少なめ
+TIDE_CALLS = 1_000
+
+
+def _timeit(fn: Callable[[], object], repeat: int) -> dict:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"best_ms": round(min(samples), 3), "median_ms": round(statistics.median(samples), 3)}
+
+
+def _tide_day() -> list[dict]:
+    """tide736 の chart.tide 相当（20分刻み・73点）"""
+    out = []
+    for i in range(0, 24 * 60 + 1, 20):
+        hh, mm = divmod(i, 60)
+        out.append({"time": f"{hh:02d}:{mm:02d}", "cm": round(110 + 80 * np.sin(i / 745 * 2 * np.pi), 1)})
+    return out
+
+
+def _time_tide_calls(day: tide_store.TideDay, day_idx: np.ndarray, minutes: np.ndarray, repeat: int) -> dict:
+    """TIDE_DAYS 日分を入れておいた一時的な tide_store で get_tide_height_for_time を1件ずつ呼ぶ（API には行かない）"""
+    port = TIDE736_PORTS["芝浦"]
+    dates = [Date(2024, 1, 1) + timedelta(days=i) for i in range(TIDE_DAYS)]
+    calls = [(dates[i], Time(int(m) // 60, int(m) % 60)) for i, m in zip(day_idx, minutes)]
+    saved = tide_store.STORE_PATH, tide_store._conn
+    with tempfile.TemporaryDirectory() as tmp:
+        tide_store.STORE_PATH, tide_store._conn = os.path.join(tmp, "tide_store.db"), None
+        try:
+            tide_store._save(port["pc"], port["hc"], {d.isoformat(): day for d in dates})
+            return _timeit(lambda: [get_tide_height_for_time(port["pc"], port["hc"], d, t) for d, t in calls], repeat)
+        finally:
+            if tide_store._conn is not None:
+                tide_store._conn.close()
+            tide_store.STORE_PATH, tide_store._conn = saved
+
+
+def _cases(rows: list[list[str]]) -> list[tuple[str, Callable[[], object]]]:
+    """(ケース名, 計測する関数)。前段の結果は先に作っておき、各ケースは自分の処理だけを測る"""
+    df = to_df(rows)
+    log = analysis_tab._prepare(df)
+    cube = analysis_cube._to_frame(analysis_cube._aggregate(df))
+    c_catch = cube[cube["catches"] > 0]
+    top_area = max(log.area_rows, key=lambda a: len(log.area_rows[a]))
+    tide = log.df["tide_cm"].to_numpy()
+    hour = log.df["hour"].to_numpy()
+    size = log.df["size"].to_numpy(dtype=float, na_value=np.nan)
+    view = edit_tab._build_view(df)
+    list_df = edit_tab._log_list_frame(view.df.head(edit_tab.PAGE_SIZE))
+    deep_id = int(view.df["id"].iloc[len(view.df) // 2])  # 真ん中あたりのページ
+
+    return [
+        ("log_schema.to_df", lambda: to_df(rows)),
+        ("analysis.prepare", lambda: analysis_tab._prepare(df)),
+        ("analysis.area_slice", lambda: analysis_tab._area_df(log, top_area)),
+        ("analysis.cube_build", lambda: analysis_cube._to_frame(analysis_cube._aggregate(df))),
+        ("analysis.summary", lambda: analysis_tab._summary_agg(cube)),
+        ("analysis.tide", lambda: analysis_tab._tide_agg(cube)),
+        ("analysis.month", lambda: analysis_tab._month_agg(cube)),
+        ("analysis.lure", lambda: analysis_tab._lure_agg(c_catch)),
+        ("analysis.bait_lure", lambda: analysis_tab._bait_lure_agg(c_catch)),
+        ("analysis.heatmap", lambda: tide_heatmap.tide_hour_grid(tide, hour, size)),
+        ("analysis.heatmap_fine", lambda: tide_heatmap.tide_hour_grid(
+            tide, hour, size, tide_step=10.0, hour_step=1, metric="max")),
+        ("edit.view_build", lambda: edit_tab._build_view(df)),
+        ("edit.view_page", lambda: edit_tab._view_page(view, deep_id, 20, False)),
+        ("edit.view_page_caught", lambda: edit_tab._view_page(view, deep_id, 20, True)),
+        ("edit.list_frame", lambda: edit_tab._log_list_frame(view.df.head(edit_tab.PAGE_SIZE))),
+        ("edit.row_labels", lambda: edit_tab._row_labels(list_df)),
+    ]
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(sizes: list[int], repeat: int = DEFAULT_REPEAT, seed: int = 0) -> dict:
+    results = []
+    for n in sizes:
+        t0 = time.perf_counter()
+        rows = synthetic_rows(n, seed)
+        gen_ms = round((time.perf_counter() - t0) * 1000, 1)
+        print(f"[{n} rows] generated in {gen_ms} ms", file=sys.stderr)
+        for name, fn in _cases(rows):
+            r = {"case": name, "rows": n, **_timeit(fn, repeat)}
+            results.append(r)
+            print(f"  {name:<28} {r['best_ms']:>10.3f} ms", file=sys.stderr)
+
+    day = parse_chart({"2024-01-01": {"tide": _tide_day()}})["2024-01-01"]
+    days = [day] * TIDE_DAYS
+    rnd = np.random.default_rng(seed)
+    day_idx = rnd.integers(0, TIDE_DAYS, size=TIDE_LOOKUPS)
+    minutes = rnd.integers(0, 24 * 60, size=TIDE_LOOKUPS).astype(float)
+    results.append({
+        "case": "tide736.interp_days", "rows": TIDE_LOOKUPS,
+        **_timeit(lambda: interp_days(days, day_idx, minutes), repeat),
+    })
+    results.append({
+        "case": "tide736.get_tide_height_for_time", "rows": TIDE_CALLS,
+        **_time_tide_calls(day, day_idx[:TIDE_CALLS], minutes[:TIDE_CALLS], repeat),
+    })
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="行数（1000〜1000000）")
+    ap.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="JSON の保存先（省略時は標準出力）")
+    args = ap.parse_args(argv)
+
+    report = run(args.sizes, args.repeat, args.seed)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# bench/synth.py
+"""
+ベンチマーク用の合成釣行ログ。列は log_schema.COLUMNS と同じで、値は get_all_values() と同じ文字列。
+エリア・潮回り・ルアー・ベイトの偏りや、時刻未入力（00:00）・ボウズ（size 0）・画像あり/なしの割合を
+実データに寄せてある。1M 行でも数秒で作れるよう列ごとに NumPy で生成する。
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from log_schema import COLUMNS, DEFAULT_BAIT, DEFAULT_TIME
+
+AREAS = ["芝浦", "羽田", "銚子", "鴨川", "岩井袋", "横須賀", "江の島", "気仙沼", "石巻"]
+AREA_WEIGHTS = [0.25, 0.2, 0.05, 0.05, 0.05, 0.15, 0.15, 0.05, 0.05]
+TIDE_TYPES = ["大潮", "中潮", "小潮", "若潮", "長潮"]
+TIDE_WEIGHTS = [0.3, 0.35, 0.2, 0.08, 0.07]
+WIND_DIRECTIONS = ["北", "北東", "東", "南東", "南", "南西", "西", "北西", ""]
+LURES = ["バイブレーション", "ミノー", "シンペン", "トップ", "ワーム", "メタルジグ", "ブレード", ""]
+ACTIONS = ["ただ巻き", "リフト&フォール", "ドリフト", "トゥイッチ", ""]
+BAITS = ["イワシ", "コノシロ", "ハク", "イナッコ", "バチ", "アミ", DEFAULT_BAIT]
+
+# 釣行は朝夕まずめに寄せる（時刻別の重み。合計は正規化する）
+_HOUR_WEIGHTS = np.array([2, 2, 2, 3, 6, 8, 8, 5, 3, 2, 1, 1, 1, 1, 1, 2, 4, 7, 8, 7, 5, 4, 3, 2], dtype=float)
+
+CATCH_RATE = 0.3
+IMAGE_RATE = 0.25
+NO_TIME_RATE = 0.1
+NO_TIDE_RATE = 0.05
+NO_BAIT_RATE = 0.1  # ベイト列を足す前の古い記録（シート上は行末が切れて返ってくる）
+
+
+def _image_urls(rnd: np.random.Generator, n: int, slot: int, has: np.ndarray) -> np.ndarray:
+    ids = rnd.integers(0, 16**12, size=n)
+    urls = np.array(
+        [f"https://res.cloudinary.com/demo/image/upload/v1/fishing_log/{i:012x}_{slot}.jpg" for i in ids],
+        dtype=object,
+    )
+    return np.where(has, urls, "")
+
+
+def synthetic_columns(n: int, seed: int = 0) -> dict[str, np.ndarray]:
+    """列名 → 文字列（object）配列。id は 1 からの連番"""
+    rnd = np.random.default_rng(seed)
+
+    days = rnd.integers(0, 365 * 7, size=n)
+    dates = (np.datetime64("2019-01-01") + days).astype(str).astype(object)
+
+    hours = rnd.choice(24, size=n, p=_HOUR_WEIGHTS / _HOUR_WEIGHTS.sum())
+    minutes = rnd.choice([0, 10, 15, 20, 30, 40, 45, 50], size=n)
+    times = np.char.add(np.char.add(np.char.zfill(hours.astype(str), 2), ":"),
+                        np.char.zfill(minutes.astype(str), 2)).astype(object)
+    times[rnd.random(n) < NO_TIME_RATE] = DEFAULT_TIME
+
+    tide = rnd.normal(110, 45, size=n).clip(-20, 260).round().astype(int).astype(str).astype(object)
+    tide[rnd.random(n) < NO_TIDE_RATE] = ""
+
+    caught = rnd.random(n) < CATCH_RATE
+    sizes = np.where(caught, rnd.normal(55, 12, size=n).clip(20, 95).round().astype(int), 0).astype(str).astype(object)
+
+    baits = rnd.choice(BAITS, size=n).astype(object)
+    baits[rnd.random(n) < NO_BAIT_RATE] = ""
+
+    n_images = np.where(rnd.random(n) < IMAGE_RATE, rnd.integers(1, 4, size=n), 0)
+
+    return {
+        "id": np.arange(1, n + 1).astype(str).astype(object),
+        "date": dates,
+        "time": times,
+        "area": rnd.choice(AREAS, size=n, p=AREA_WEIGHTS).astype(object),
+        "tide_type": rnd.choice(TIDE_TYPES, size=n, p=TIDE_WEIGHTS).astype(object),
+        "tide_height": tide,
+        "temperature": np.char.mod("%.1f", rnd.uniform(2, 32, size=n)).astype(object),
+        "wind_direction": rnd.choice(WIND_DIRECTIONS, size=n).astype(object),
+        "lure": rnd.choice(LURES, size=n).astype(object),
+        "action": rnd.choice(ACTIONS, size=n).astype(object),
+        "size": sizes,
+        "image_url1": _image_urls(rnd, n, 1, n_images >= 1),
+        "image_url2": _image_urls(rnd, n, 2, n_images >= 2),
+        "image_url3": _image_urls(rnd, n, 3, n_images >= 3),
+        "bait_pattern": baits,
+    }
+
+
+def synthetic_rows(n: int, seed: int = 0, ragged: bool = True) -> list[list[str]]:
+    """
+    get_all_values() 相当の行のリスト（ヘッダなし）。
+    ragged=True なら、シートと同じく末尾の空セルを切った短い行も混ぜる。
+    """
+    cols = synthetic_columns(n, seed)
+    rows = [list(r) for r in zip(*(cols[c] for c in COLUMNS))]
+    if ragged:
+        for r in rows:
+            while r and r[-1] == "":
+                r.pop()
+    return rows
@@ -1,10 +1,86 @@
 # check_tab.py
 from __future__ import annotations
 
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
 import pandas as pd
 import streamlit as st
 from datetime import datetime, date as Date
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import http_cache
+import perf
+from perf import timed
+
+# 取得元ごとのタイムアウト（秒）。天気と水温は同時に取りに行き、届いた順に表示する。
+# 1つが遅い・落ちていても、他の表示は待たせない
+WEATHER_TIMEOUT_SEC = 8.0
+SST_TIMEOUT_SEC = 8.0
+
+
+def _render_weather(df_hourly: pd.DataFrame, *, filter_every_3_hours, weather_code_label,
+                    wind_dir_arrow, wind_speed_style) -> None:
+    df_3h = filter_every_3_hours(df_hourly)
+
+    df_view = pd.DataFrame({
+        "時刻": df_3h["time"].dt.strftime("%H:%M"),
+        "天気": df_3h["weather_code"].apply(weather_code_label),
+        "気温(℃)": df_3h["temp"],
+        "降水(mm)": df_3h["rain"],
+        "風速(m/s)": df_3h["wind_speed"],
+        "風向": df_3h["wind_dir"].apply(wind_dir_arrow),
+    })
+
+    styled = (
+        df_view.style
+        .format({
+            "気温(℃)": "{:.1f}",
+            "降水(mm)": "{:.1f}",
+            "風速(m/s)": "{:.1f}",
+        })
+        .map(wind_speed_style, subset=["風速(m/s)"])
+    )
+
+    st.dataframe(
+        styled,
+        hide_index=True,
+        use_container_width=True,
+    )
+    st.caption("※ Open-Meteo（予報モデル）。風速は10m高度の値です。")
 
+
+def _render_sst(sst: float | None, spot_name: str) -> None:
+    if sst is not None:
+        st.metric(f"{spot_name} 付近の海面水温", f"{sst:.1f} ℃")
+    else:
+        st.info("現在の水温データを取得できませんでした。")
+
+
+def _fill_as_completed(jobs: dict[Future, tuple], started: float) -> None:
+    """
+    jobs：Future → (表示先の st.empty, 取得元の名前, タイムアウト秒, 結果を描く関数)。
+    届いたものから描き、タイムアウトを過ぎたものは待つのをやめて警告を出す（スレッドは放っておく）
+    """
+    pending = set(jobs)
+    while pending:
+        deadline = min(started + jobs[f][2] for f in pending)
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                             return_when=FIRST_COMPLETED)
+        for f in done:
+            slot, label, _, render = jobs[f]
+            with slot.container():
+                try:
+                    render(f.result())
+                except Exception as e:
+                    st.warning(f"{label}の取得に失敗しました: {e}")
+        expired = {f for f in pending if started + jobs[f][2] <= time.monotonic()}
+        for f in expired:
+            slot, label, timeout, _ = jobs[f]
+            slot.warning(f"{label}を {timeout:g} 秒以内に取得できませんでした。")
+        pending -= expired
+
+@timed("check.render")
 def render_check_tab(
     *,
     TIDE736_PORTS: dict,
@@ -54,6 +130,18 @@ def render_check_tab(
 
     st.divider()
 
+    # ==== 天気・水温は同時に取りに行く（タイドグラフの画像はブラウザが直接読み込む） ====
+    ctx = get_script_run_ctx(suppress_warning=True)
+    bind_perf = perf.worker_init()
+
+    def _init_worker():
+        add_script_run_ctx(None, ctx)
+        bind_perf()
+
+    pool = ThreadPoolExecutor(max_workers=2, initializer=_init_worker)
+    started = time.monotonic()
+    jobs: dict[Future, tuple] = {}
+
     # ==== 3時間天気 ====
     st.subheader("3時間ごとの天気・風（目安）")
 
@@ -61,37 +149,16 @@ def render_check_tab(
     if p is None:
         st.info("この港の天気座標が未登録です。")
     else:
-        try:
-            df_hourly = fetch_weather_hourly(p["lat"], p["lon"], tide_date)
-            df_3h = filter_every_3_hours(df_hourly)
-
-            df_view = pd.DataFrame({
-                "時刻": df_3h["time"].dt.strftime("%H:%M"),
-                "天気": df_3h["weather_code"].apply(weather_code_label),
-                "気温(℃)": df_3h["temp"],
-                "降水(mm)": df_3h["rain"],
-                "風速(m/s)": df_3h["wind_speed"],
-                "風向": df_3h["wind_dir"].apply(wind_dir_arrow),
-            })
-
-            styled = (
-                df_view.style
-                .format({
-                    "気温(℃)": "{:.1f}",
-                    "降水(mm)": "{:.1f}",
-                    "風速(m/s)": "{:.1f}",
-                })
-                .map(wind_speed_style, subset=["風速(m/s)"])
-            )
-
-            st.dataframe(
-                styled,
-                hide_index=True,
-                use_container_width=True,
-            )
-            st.caption("※ Open-Meteo（予報モデル）。風速は10m高度の値です。")
-        except Exception as e:
-            st.warning(f"天気の取得に失敗しました: {e}")
+        slot = st.empty()
+        slot.caption("天気を取得中…")
+        fut = pool.submit(fetch_weather_hourly, p["lat"], p["lon"], tide_date, timeout=WEATHER_TIMEOUT_SEC)
+        jobs[fut] = (slot, "天気", WEATHER_TIMEOUT_SEC, lambda df_hourly: _render_weather(
+            df_hourly,
+            filter_every_3_hours=filter_every_3_hours,
+            weather_code_label=weather_code_label,
+            wind_dir_arrow=wind_dir_arrow,
+            wind_speed_style=wind_speed_style,
+        ))
 
     st.divider()
 
@@ -99,11 +166,17 @@ def render_check_tab(
     st.subheader("現在の水温（海面・推定値）")
 
     sst_point = SST_POINTS.get(spot_name, {"lat": 35.6, "lon": 139.9})
+    slot = st.empty()
+    slot.caption("水温を取得中…")
+    fut = pool.submit(fetch_current_sea_surface_temp, sst_point["lat"], sst_point["lon"], timeout=SST_TIMEOUT_SEC)
+    jobs[fut] = (slot, "水温", SST_TIMEOUT_SEC, lambda sst: _render_sst(sst, spot_name))
+
     try:
-        sst = fetch_current_sea_surface_temp(sst_point["lat"], sst_point["lon"])
-        if sst is not None:
-            st.metric(f"{spot_name} 付近の海面水温", f"{sst:.1f} ℃")
-        else:
-            st.info("現在の水温データを取得できませんでした。")
-    except Exception as e:
-        st.warning(f"水温の取得に失敗しました: {e}")
+        _fill_as_completed(jobs, started)
+    finally:
+        pool.shutdown(wait=False)
+
+    if perf.enabled():
+        s = http_cache.cache_stats()
+        st.caption(f"API キャッシュ：ヒット {s['hits']} / ミス {s['misses']}（期限切れ {s['expired']}）"
+                   f" / {s['entries']} 件保存（上限 {s['max_entries']}、追い出し {s['evictions']}）")
@@ -0,0 +1,119 @@
+# data_cache.py
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# 1件の変更：(変更前のレコード, 変更後のレコード)。追加は (None, 新)、削除は (旧, None)。
+# レコードは列名 → 値の dict（値はシートの文字列でも SQLite の型付きの値でもよい）
+Change = tuple[Optional[dict], Optional[dict]]
+
+# 差分を覚えておくバージョン数（これより遅れている利用側は作り直しになる）
+CHANGE_LOG_SIZE = 1000
+
+# プロセス全体で共有（Streamlit の複数セッションから同時に呼ばれる前提）
+_lock = threading.RLock()
+_version = 0
+_entries: dict[str, tuple[int, object]] = {}
+_key_locks: dict[str, threading.Lock] = {}
+_stats = {"hits": 0, "misses": 0}
+_change_log: deque[tuple[int, Optional[list[Change]]]] = deque(maxlen=CHANGE_LOG_SIZE)
+
+
+def data_version() -> int:
+    """現在のデータバージョン（書き込みのたびに単調増加）"""
+    with _lock:
+        return _version
+
+
+def bump_version(changes: Optional[list[Change]] = None) -> int:
+    """
+    データが変わったことを通知する。古いバージョンのキャッシュは次の参照で捨てられる。
+    changes を渡すと、集計などを差分で更新したい利用側が changes_since で受け取れる。
+    changes=None は「何が変わったか分からない」（全件の再同期など）の意味。
+    """
+    global _version
+    with _lock:
+        _version += 1
+        _change_log.append((_version, list(changes) if changes is not None else None))
+        return _version
+
+
+def changes_since(version: int) -> tuple[int, Optional[list[Change]]]:
+    """
+    version より後の変更をまとめて (現在のバージョン, 変更のリスト) で返す。
+    途中に中身の分からない変更がある・古すぎて覚えていない場合、変更は None（作り直すこと）。
+    """
+    with _lock:
+        if version == _version:
+            return _version, []
+        out: list[Change] = []
+        expected = version + 1
+        for v, changes in _change_log:
+            if v <= version:
+                continue
+            if v != expected or changes is None:
+                return _version, None
+            out.extend(changes)
+            expected += 1
+        return _version, (out if expected == _version + 1 else None)
+
+
+def restore_version(version: int) -> int:
+    """
+    起動直後に、保存しておいたバージョン（スナップショットなど）まで番号を進める。
+    プロセスをまたいでもバージョンが逆戻りしないようにするため。
+    """
+    global _version
+    with _lock:
+        _version = max(_version, int(version))
+        return _version
+
+
+def put(key: str, value: object, version: int | None = None) -> None:
+    """外で用意した値（スナップショットなど）をキャッシュに入れる"""
+    with _lock:
+        _entries[key] = (_version if version is None else version, value)
+
+
+def peek(key: str) -> tuple[int, object] | None:
+    """(バージョン, 値) をそのまま返す（古いバージョンのものでも返す。統計には数えない）"""
+    with _lock:
+        return _entries.get(key)
+
+
+def get_or_load(key: str, loader: Callable[[], T]) -> T:
+    """
+    key のキャッシュが現在のバージョンのものならそれを返し、そうでなければ loader() で作り直す。
+    同じ key の読み込みはセッションをまたいで1回にまとめる（他が読み込み中なら待って結果を使う）。
+    返り値は共有オブジェクトなので、呼び出し側で書き換える場合はコピーすること。
+    """
+    with _lock:
+        v = _version
+        e = _entries.get(key)
+        if e is not None and e[0] == v:
+            _stats["hits"] += 1
+            return e[1]  # type: ignore[return-value]
+        klock = _key_locks.setdefault(key, threading.Lock())
+
+    with klock:
+        with _lock:
+            v = _version
+            e = _entries.get(key)
+            if e is not None and e[0] == v:
+                _stats["hits"] += 1
+                return e[1]  # type: ignore[return-value]
+        value = loader()
+        with _lock:
+            _stats["misses"] += 1
+            # 読み込み中にバージョンが進んでいたら、読み込み開始時点のバージョンで登録（次回は読み直し）
+            _entries[key] = (v, value)
+        return value
+
+
+def cache_stats() -> dict:
+    with _lock:
+        return {"version": _version, "entries": len(_entries), **_stats}
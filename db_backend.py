@@ -0,0 +1,125 @@
+# db_backend.py
+"""
+ストレージバックエンドの切り替え口。
+アプリ側はここから fetch_all / insert_row などを import し、実体は設定で選ぶ。
+
+    環境変数 FISHING_LOG_BACKEND、または secrets.toml の
+    [storage]
+    backend = "sqlite"   # "gsheets"（既定） / "sqlite"
+"""
+from __future__ import annotations
+
+import importlib
+import os
+from types import ModuleType
+from typing import Optional, Protocol
+
+import pandas as pd
+import streamlit as st
+
+from perf import timed
+
+# バックエンド名 → モジュール名
+BACKENDS = {
+    "gsheets": "db_utils_gsheets",
+    "sqlite": "db_utils",
+}
+DEFAULT_BACKEND = "gsheets"
+
+
+class StorageBackend(Protocol):
+    """各バックエンドモジュールがそろえる関数（モジュールそのものがこの形を満たす）"""
+
+    def fetch_all(self) -> pd.DataFrame: ...
+    def fetch_range(self, start, end) -> pd.DataFrame: ...
+    def insert_row(self, date: str, time: Optional[str], area: str, tide_type: str,
+                   tide_height: Optional[float], temperature: Optional[float],
+                   wind_direction: Optional[str], lure: Optional[str], action: Optional[str],
+                   size: Optional[float], image_url1: Optional[str] = None,
+                   image_url2: Optional[str] = None, image_url3: Optional[str] = None,
+                   bait_pattern: Optional[str] = None) -> None: ...
+    def update_row(self, row_id: int, area: str, tide_type: str, temperature: Optional[float],
+                   wind_direction: Optional[str], lure: Optional[str], action: Optional[str],
+                   size: Optional[float], tide_height: Optional[float], time: Optional[str],
+                   image_url1: Optional[str] = None, image_url2: Optional[str] = None,
+                   image_url3: Optional[str] = None, bait_pattern: Optional[str] = None) -> None: ...
+    def delete_row(self, row_id: int) -> None: ...
+    def insert_rows(self, records: list[dict]) -> list[dict]: ...
+    def update_rows(self, records: list[dict]) -> list[dict]: ...
+    def delete_rows(self, row_ids: list[int]) -> list[dict]: ...
+    def search_rows(self, filters: dict, limit: int, offset: int = 0) -> tuple[pd.DataFrame, int]: ...
+    def distinct_values(self, column: str) -> list[str]: ...
+
+
+def backend_name() -> str:
+    name = os.environ.get("FISHING_LOG_BACKEND")
+    if not name:
+        try:
+            name = st.secrets.get("storage", {}).get("backend")
+        except Exception:
+            name = None  # secrets.toml が無い（ローカル実行・ベンチなど）
+    name = (name or DEFAULT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"未知のストレージバックエンドです: {name}（{', '.join(BACKENDS)} のどれか）")
+    return name
+
+
+def get_backend() -> StorageBackend | ModuleType:
+    return importlib.import_module(BACKENDS[backend_name()])
+
+
+@st.cache_resource(show_spinner=False)
+@timed("storage.migrate", "storage")
+def migrate_on_startup() -> Optional[dict]:
+    """
+    アプリの起動時に1回だけ呼ぶ。sqlite バックエンドなら接続を開いてスキーマのマイグレーションを当て、
+    db_migrations.migrate の結果（from / to / applied / elapsed_ms）を返す。gsheets は None
+    """
+    if backend_name() != "sqlite":
+        return None
+    backend = get_backend()
+    backend.get_conn()
+    return backend.migration_report()
+
+
+# ---- アプリから使う入口（呼び出し時に設定を見て振り分ける。perf で時間を記録） ----
+@timed("storage.fetch_all", "storage")
+def fetch_all() -> pd.DataFrame:
+    return get_backend().fetch_all()
+
+@timed("storage.search_rows", "storage")
+def search_rows(filters: dict, limit: int, offset: int = 0) -> tuple[pd.DataFrame, int]:
+    """filters は log_query.where_clause のキーワード引数（date_from, date_to, area, lure, caught_only, keyword）"""
+    return get_backend().search_rows(filters, limit, offset)
+
+@timed("storage.distinct_values", "storage")
+def distinct_values(column: str) -> list[str]:
+    return get_backend().distinct_values(column)
+
+@timed("storage.fetch_range", "storage")
+def fetch_range(start, end) -> pd.DataFrame:
+    return get_backend().fetch_range(start, end)
+
+@timed("storage.insert_row", "storage")
+def insert_row(**kwargs) -> None:
+    get_backend().insert_row(**kwargs)
+
+@timed("storage.update_row", "storage")
+def update_row(**kwargs) -> None:
+    get_backend().update_row(**kwargs)
+
+@timed("storage.delete_row", "storage")
+def delete_row(row_id: int) -> None:
+    get_backend().delete_row(row_id)
+
+@timed("storage.insert_rows", "storage")
+def insert_rows(records: list[dict]) -> list[dict]:
+    return get_backend().insert_rows(records)
+
+@timed("storage.update_rows", "storage")
+def update_rows(records: list[dict]) -> list[dict]:
+    return get_backend().update_rows(records)
+
+@timed("storage.delete_rows", "storage")
+def delete_rows(row_ids: list[int]) -> list[dict]:
+    return get_backend().delete_rows(row_ids)
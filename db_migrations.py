@@ -0,0 +1,118 @@
+# db_migrations.py
+"""
+SQLite（fishing_log.db）のスキーマをバージョン管理して上げていく。
+migrate(conn) は何度実行しても同じ結果になる（適用済みのバージョンは飛ばす）。
+新しい変更は MIGRATIONS の末尾に (次の番号, 名前, 関数) を足すだけ。
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from datetime import datetime
+from typing import Callable
+
+from log_schema import NUMERIC_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+TABLE = "fishing_log"
+
+
+def _columns(conn: sqlite3.Connection) -> set[str]:
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({TABLE})")}
+
+
+def _add_columns(conn: sqlite3.Connection, cols: list[str]) -> None:
+    """無い列だけ足す（fishingdb_add.py のように2回目で落ちない）"""
+    existing = _columns(conn)
+    for c in cols:
+        if c not in existing:
+            sql_type = "REAL" if c in NUMERIC_COLUMNS else "TEXT"
+            conn.execute(f'ALTER TABLE {TABLE} ADD COLUMN "{c}" {sql_type}')
+
+
+def _m001_create_table(conn: sqlite3.Connection) -> None:
+    # 最初期のスキーマ
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            area TEXT,
+            tide_type TEXT,
+            temperature REAL,
+            wind_direction TEXT,
+            lure TEXT,
+            action TEXT,
+            size REAL
+        )
+    """)
+
+
+def _m002_time_and_tide_height(conn: sqlite3.Connection) -> None:
+    # 旧 fishingdb_add.py の内容
+    _add_columns(conn, ["time", "tide_height"])
+
+
+def _m003_images_and_bait(conn: sqlite3.Connection) -> None:
+    # db_utils_gsheets.COLUMNS にそろえる
+    _add_columns(conn, ["image_url1", "image_url2", "image_url3", "bait_pattern"])
+
+
+def _m004_query_indexes(conn: sqlite3.Connection) -> None:
+    # 日付ソート・エリア絞り込み・ルアー集計をフルスキャンにしない
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_date ON {TABLE}(date)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_area ON {TABLE}(area)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_area_date ON {TABLE}(area, date)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_lure ON {TABLE}(lure)")
+
+
+# (バージョン, 名前, 適用関数)。番号は 1 から連番で、既存のものは書き換えない
+MIGRATIONS: list[tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "create fishing_log", _m001_create_table),
+    (2, "add time, tide_height", _m002_time_and_tide_height),
+    (3, "add image_url1-3, bait_pattern", _m003_images_and_bait),
+    (4, "indexes on date, area, (area, date), lure", _m004_query_indexes),
+]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, name TEXT, applied_at TEXT)"
+    )
+    r = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return int(r[0]) if r and r[0] is not None else 0
+
+
+def migrate(conn: sqlite3.Connection) -> dict:
+    """
+    未適用のマイグレーションを順に当てる。1件ごとに1トランザクション。
+    戻り値は {"from", "to", "applied": [名前...], "elapsed_ms"}。
+    """
+    t0 = time.perf_counter()
+    with conn:
+        start = current_version(conn)
+    applied = []
+    for version, name, fn in MIGRATIONS:
+        if version <= start:
+            continue
+        with conn:
+            fn(conn)
+            conn.execute(
+                "INSERT INTO schema_version(version, name, applied_at) VALUES(?, ?, ?)",
+                (version, name, datetime.now().isoformat(timespec="seconds")),
+            )
+        applied.append(name)
+
+    report = {
+        "from": start,
+        "to": MIGRATIONS[-1][0] if applied else start,
+        "applied": applied,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+    logger.info(
+        "schema migration v%s -> v%s (%s) in %.2f ms",
+        report["from"], report["to"], ", ".join(applied) or "up to date", report["elapsed_ms"],
+    )
+    return report
@@ -0,0 +1,203 @@
+# db_mirror.py
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# スプレッドシートのローカルミラー（fishing_log.db とは別ファイル）
+MIRROR_PATH = "fishing_log_mirror.db"
+
+
+class SheetMirror:
+    """
+    Google スプレッドシートの内容を行順そのままに保持する SQLite ミラー。
+    値はシートと同じ文字列で持ち、型変換は db_utils_gsheets._to_df に任せる。
+    pos（挿入順）がシート上の並び順に対応する。
+    """
+
+    def __init__(self, columns: list[str], path: str = MIRROR_PATH):
+        self.columns = list(columns)
+        self.path = path
+        self._lock = threading.RLock()
+        # 行インデックス（id → シート行番号）。行の増減があったら作り直す
+        self._index: Optional[dict[str, int]] = None
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    # ---- スキーマ ----
+    def _col_list(self) -> str:
+        return ", ".join(f'"{c}"' for c in self.columns)
+
+    def _init_schema(self) -> None:
+        cols = ", ".join(f'"{c}" TEXT' for c in self.columns)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS sheet_rows (pos INTEGER PRIMARY KEY AUTOINCREMENT, {cols})"
+            )
+            self._create_indexes()
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            # ヘッダ構成が変わったら作り直し（次回の同期で全件取り直す）
+            existing = [r[1] for r in self._conn.execute("PRAGMA table_info(sheet_rows)")][1:]
+            if existing != self.columns:
+                self._conn.execute("DROP TABLE sheet_rows")
+                self._conn.execute("DELETE FROM meta")
+                self._conn.execute(
+                    f"CREATE TABLE sheet_rows (pos INTEGER PRIMARY KEY AUTOINCREMENT, {cols})"
+                )
+                self._create_indexes()
+
+    def _create_indexes(self) -> None:
+        # id は行の特定用、date / area / lure は編集タブの検索（log_query）用
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_sheet_rows_id ON sheet_rows("id")')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_sheet_rows_date ON sheet_rows("date")')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_sheet_rows_area_date ON sheet_rows("area", "date")')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_sheet_rows_lure ON sheet_rows("lure")')
+
+    def _normalize(self, row: list[str]) -> list[str]:
+        n = len(self.columns)
+        r = ["" if v is None else str(v) for v in row[:n]]
+        if len(r) < n:
+            r += [""] * (n - len(r))
+        return r
+
+    # ---- メタ情報 ----
+    def _get_meta(self, key: str) -> Optional[str]:
+        cur = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,))
+        r = cur.fetchone()
+        return r[0] if r else None
+
+    def _set_meta(self, key: str, value) -> None:
+        self._conn.execute(
+            "INSERT INTO meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+    def is_initialized(self) -> bool:
+        with self._lock:
+            return self._get_meta("synced_at") is not None
+
+    def sheet_row_count(self) -> int:
+        """最後に把握しているシートのデータ行数（ヘッダ除く）"""
+        with self._lock:
+            v = self._get_meta("sheet_rows")
+            return int(v) if v else 0
+
+    def last_synced_at(self) -> float:
+        with self._lock:
+            v = self._get_meta("synced_at")
+            return float(v) if v else 0.0
+
+    def mark_synced(self) -> None:
+        with self._lock, self._conn:
+            self._set_meta("synced_at", time.time())
+
+    # ---- 読み出し ----
+    def read_rows(self) -> list[list[str]]:
+        with self._lock:
+            cur = self._conn.execute(f"SELECT {self._col_list()} FROM sheet_rows ORDER BY pos")
+            return [list(r) for r in cur]
+
+    def search(self, where: str, params: list, order_by: str,
+               limit: int, offset: int = 0) -> tuple[list[list[str]], int]:
+        """log_query.where_clause の条件で絞り込んだ1ページ分の行と、条件に合う全件数"""
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM sheet_rows {where}", params).fetchone()[0]
+            cur = self._conn.execute(
+                f"SELECT {self._col_list()} FROM sheet_rows {where} {order_by} LIMIT ? OFFSET ?",
+                (*params, int(limit), int(offset)),
+            )
+            return [list(r) for r in cur], int(total)
+
+    def distinct(self, column: str) -> list[str]:
+        if column not in self.columns:
+            raise ValueError(f"unknown column: {column}")
+        with self._lock:
+            cur = self._conn.execute(
+                f"SELECT DISTINCT \"{column}\" FROM sheet_rows WHERE \"{column}\" != '' ORDER BY \"{column}\""
+            )
+            return [r[0] for r in cur]
+
+    def row_index(self) -> dict[str, int]:
+        """id（文字列）→ シート上の行番号（ヘッダが1行目なのでデータは2行目から）"""
+        with self._lock:
+            if self._index is None:
+                cur = self._conn.execute('SELECT "id" FROM sheet_rows ORDER BY pos')
+                self._index = {r[0]: i for i, r in enumerate(cur, start=2)}
+            return self._index
+
+    # ---- 書き込み ----
+    def locked(self) -> threading.RLock:
+        """
+        書き込みとその変更通知（data_cache.bump_version）をまとめて囲むロック。
+        中の書き込みメソッドは同じロックを取り直すだけなので、読み出しから見て
+        「行は書き込み済みなのにバージョンは古い」瞬間がなくなる
+        """
+        return self._lock
+
+    def replace_all(self, rows: list[list[str]]) -> None:
+        """シート全体で置き換える（再同期用）"""
+        ph = ", ".join("?" for _ in self.columns)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sheet_rows")
+            self._index = None
+            self._conn.executemany(
+                f"INSERT INTO sheet_rows ({self._col_list()}) VALUES ({ph})",
+                [self._normalize(r) for r in rows],
+            )
+            self._set_meta("sheet_rows", len(rows))
+            self._set_meta("synced_at", time.time())
+
+    def append_rows(self, rows: list[list[str]]) -> None:
+        """シート末尾に追加された行を取り込む"""
+        if not rows:
+            return
+        ph = ", ".join("?" for _ in self.columns)
+        with self._lock, self._conn:
+            known = self.sheet_row_count()
+            self._conn.executemany(
+                f"INSERT INTO sheet_rows ({self._col_list()}) VALUES ({ph})",
+                [self._normalize(r) for r in rows],
+            )
+            self._set_meta("sheet_rows", known + len(rows))
+            if self._index is not None:
+                # 末尾への追加は既存の行番号を動かさないので足すだけ
+                for i, r in enumerate(rows, start=known + 2):
+                    self._index[str(r[0]) if r else ""] = i
+
+    def _get_row(self, row_id: int) -> Optional[list[str]]:
+        cur = self._conn.execute(f'SELECT {self._col_list()} FROM sheet_rows WHERE "id" = ?', (str(row_id),))
+        r = cur.fetchone()
+        return list(r) if r else None
+
+    def update_rows(self, rows: list[tuple[int, list[str]]]) -> list[tuple[list[str], list[str]]]:
+        """[(id, 行の値), ...] をまとめて書き換える。戻り値は書き換えた行の (変更前, 変更後)"""
+        sets = ", ".join(f'"{c}" = ?' for c in self.columns)
+        changed = []
+        with self._lock, self._conn:
+            for row_id, values in rows:
+                old = self._get_row(row_id)
+                new = self._normalize(values)
+                self._conn.execute(f'UPDATE sheet_rows SET {sets} WHERE "id" = ?', (*new, str(row_id)))
+                if old is not None:
+                    changed.append((old, new))
+        return changed
+
+    def delete_rows(self, row_ids: list[int]) -> list[list[str]]:
+        """まとめて削除する。戻り値は削除した行の値"""
+        removed_rows = []
+        with self._lock, self._conn:
+            removed = 0
+            for row_id in row_ids:
+                old = self._get_row(row_id)
+                cur = self._conn.execute('DELETE FROM sheet_rows WHERE "id" = ?', (str(row_id),))
+                removed += cur.rowcount
+                if old is not None:
+                    removed_rows.append(old)
+            if removed:
+                self._index = None  # 下の行が繰り上がる
+                self._set_meta("sheet_rows", max(self.sheet_row_count() - removed, 0))
+        return removed_rows
@@ -1,11 +1,286 @@
 import sqlite3
+import threading
+from typing import Optional
+
 import pandas as pd
 
+from data_cache import bump_version
+from db_migrations import migrate
+from log_query import ORDER_BY, where_clause
+from log_schema import COLUMNS, DEFAULT_BAIT, DEFAULT_TIME, to_df
+from log_snapshot import cached_frame
+
+# ローカル SQLite バックエンド（db_utils_gsheets と同じ関数をそろえる）
 DB_PATH = "fishing_log.db"
+TABLE = "fishing_log"  # スキーマは db_migrations で管理
+
+_DATA_COLUMNS = COLUMNS[1:]  # id 以外
+_IMAGE_COLUMNS = ["image_url1", "image_url2", "image_url3"]
+
+# 同じ SQL 文字列を使い回すと、接続ごとの文キャッシュ（prepared statement）が効く
+_SELECT_ALL = "SELECT {cols} FROM {table} ORDER BY id".format(
+    cols=", ".join(f"IFNULL(\"{c}\", '')" for c in COLUMNS), table=TABLE,
+)
+_SELECT_RANGE = "SELECT {cols} FROM {table} WHERE date >= ? AND date <= ? ORDER BY id".format(
+    cols=", ".join(f"IFNULL(\"{c}\", '')" for c in COLUMNS), table=TABLE,
+)
+_SELECT_ONE = "SELECT {cols} FROM {table} WHERE id = ?".format(
+    cols=", ".join(f"IFNULL(\"{c}\", '')" for c in COLUMNS), table=TABLE,
+)
+_INSERT = "INSERT INTO {table} ({cols}) VALUES ({ph})".format(
+    table=TABLE,
+    cols=", ".join(f'"{c}"' for c in _DATA_COLUMNS),
+    ph=", ".join("?" for _ in _DATA_COLUMNS),
+)
+# date は既存を保持、画像URLは None なら既存を保持（db_utils_gsheets.update_row と同じ）
+_UPDATE = "UPDATE {table} SET {sets} WHERE id = ?".format(
+    table=TABLE,
+    sets=", ".join(
+        f'"{c}" = COALESCE(?, "{c}")' if c in _IMAGE_COLUMNS else f'"{c}" = ?'
+        for c in _DATA_COLUMNS if c != "date"
+    ),
+)
+_DELETE = f"DELETE FROM {TABLE} WHERE id = ?"
+
+# 書き込みはコミットから変更通知（bump_version）までをこのロックの中で行う。
+# 通知の前に読まれると「書き込み済みの行」と「書き込み前のバージョン」が組になり、
+# analysis_cube がその変更を二重に足してしまう
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_migration_report: Optional[dict] = None
 
 def get_conn():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    """
+    プロセスで1本の接続を共有する（書き込みは _lock で直列化）。
+    最初に開いたときにスキーマのマイグレーションを当てる。
+    """
+    global _conn, _migration_report
+    if _conn is None:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        _migration_report = migrate(conn)
+        _conn = conn
+    return _conn
+
+def migration_report() -> Optional[dict]:
+    """起動時に当てたマイグレーションの結果（db_migrations.migrate の戻り値）"""
+    return _migration_report
+
+def _query(sql: str, params: tuple = ()) -> pd.DataFrame:
+    with _lock:
+        rows = get_conn().execute(sql, params).fetchall()
+    return to_df(rows)
+
+def fetch_all() -> pd.DataFrame:
+    # データバージョンが変わらない限り同じ DataFrame を使い回す（呼び出し側が書き換えてもいいようにコピーを返す）
+    return cached_frame("sqlite.fetch_all", lambda: _query(_SELECT_ALL)).copy()
+
+def fetch_range(start, end) -> pd.DataFrame:
+    """date が start〜end（両端含む）のレコード"""
+    return _query(_SELECT_RANGE, (str(start), str(end)))
+
+def search_rows(filters: dict, limit: int, offset: int = 0) -> tuple[pd.DataFrame, int]:
+    """
+    編集タブの検索。filters は log_query.where_clause のキーワード引数。
+    1ページ分の DataFrame と条件に合う全件数を返す（date / area / lure のインデックスが効く）。
+    """
+    where, params = where_clause(**filters)
+    cols = ", ".join(f"IFNULL(\"{c}\", '')" for c in COLUMNS)
+    with _lock:
+        conn = get_conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM {TABLE} {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {cols} FROM {TABLE} {where} {ORDER_BY} LIMIT ? OFFSET ?",
+            (*params, int(limit), int(offset)),
+        ).fetchall()
+    return to_df(rows), int(total)
+
+def distinct_values(column: str) -> list[str]:
+    """検索の選択肢用（空文字・NULL を除いた値の一覧）"""
+    if column not in COLUMNS:
+        raise ValueError(f"unknown column: {column}")
+    with _lock:
+        rows = get_conn().execute(
+            f"SELECT DISTINCT \"{column}\" FROM {TABLE} WHERE IFNULL(\"{column}\", '') != '' ORDER BY \"{column}\""
+        ).fetchall()
+    return [r[0] for r in rows]
+
+def _result(row_id: Optional[int], status: str = "ok", error: Optional[Exception] = None) -> dict:
+    """バッチ API の1件ごとの結果。status は "ok" / "not_found" / "error" """
+    return {"id": row_id, "status": status, "error": error}
+
+def _raise_on_error(res: dict) -> None:
+    if res["status"] == "error":
+        raise res["error"]
+
+def _get_record(conn: sqlite3.Connection, row_id: int) -> Optional[dict]:
+    """変更通知用に1件を列名つき dict で読む（_lock を持った状態で呼ぶ）"""
+    r = conn.execute(_SELECT_ONE, (int(row_id),)).fetchone()
+    return dict(zip(COLUMNS, r)) if r else None
+
+def _insert_params(date: str,
+                   time: Optional[str],
+                   area: str,
+                   tide_type: str,
+                   tide_height: Optional[float],
+                   temperature: Optional[float],
+                   wind_direction: Optional[str],
+                   lure: Optional[str],
+                   action: Optional[str],
+                   size: Optional[float],
+                   image_url1: Optional[str] = None,
+                   image_url2: Optional[str] = None,
+                   image_url3: Optional[str] = None,
+                   bait_pattern: Optional[str] = None,
+                   ) -> tuple:
+    return (
+        date or "",
+        time or DEFAULT_TIME,
+        area or "",
+        tide_type or "",
+        tide_height,
+        temperature,
+        wind_direction or "",
+        lure or "",
+        action or "",
+        size,
+        image_url1 or "",
+        image_url2 or "",
+        image_url3 or "",
+        bait_pattern or DEFAULT_BAIT,
+    )
+
+def _update_params(row_id: int, *,
+                   area, tide_type, temperature, wind_direction, lure, action,
+                   size, tide_height, time,
+                   image_url1=None, image_url2=None, image_url3=None,
+                   bait_pattern=None) -> tuple:
+    # _UPDATE の SET 句（date を除く _DATA_COLUMNS の順）に合わせる
+    return (
+        time or DEFAULT_TIME,
+        area or "",
+        tide_type or "",
+        tide_height,
+        temperature,
+        wind_direction or "",
+        lure or "",
+        action or "",
+        size,
+        image_url1,
+        image_url2,
+        image_url3,
+        bait_pattern or DEFAULT_BAIT,
+        row_id,
+    )
+
+def insert_rows(records: list[dict]) -> list[dict]:
+    """複数レコードを1トランザクションで追加する。戻り値は records と同じ順の結果"""
+    results = []
+    changes = []
+    with _lock:
+        conn = get_conn()
+        with conn:
+            for rec in records:
+                try:
+                    params = _insert_params(**rec)
+                    cur = conn.execute(_INSERT, params)
+                    results.append(_result(cur.lastrowid))
+                    changes.append((None, dict(zip(COLUMNS, (cur.lastrowid, *params)))))
+                except Exception as e:
+                    results.append(_result(None, "error", e))
+        if changes:
+            bump_version(changes)
+    return results
+
+def update_rows(records: list[dict]) -> list[dict]:
+    """複数レコードを1トランザクションで更新する。各 record は row_id を含む update_row と同じキーワードの dict"""
+    results = []
+    changes = []
+    with _lock:
+        conn = get_conn()
+        with conn:
+            for rec in records:
+                rid = rec.get("row_id")
+                try:
+                    old = _get_record(conn, rid)
+                    cur = conn.execute(_UPDATE, _update_params(**rec))
+                    if cur.rowcount:
+                        results.append(_result(rid))
+                        changes.append((old, _get_record(conn, rid)))
+                    else:
+                        results.append(_result(rid, "not_found"))
+                except Exception as e:
+                    results.append(_result(rid, "error", e))
+        if changes:
+            bump_version(changes)
+    return results
+
+def delete_rows(row_ids: list[int]) -> list[dict]:
+    """複数レコードを1トランザクションで削除する"""
+    results = []
+    changes = []
+    with _lock:
+        conn = get_conn()
+        with conn:
+            for rid in row_ids:
+                old = _get_record(conn, rid)
+                cur = conn.execute(_DELETE, (int(rid),))
+                if cur.rowcount:
+                    results.append(_result(rid))
+                    changes.append((old, None))
+                else:
+                    results.append(_result(rid, "not_found"))
+        if changes:
+            bump_version(changes)
+    return results
+
+def insert_row(date: str,
+               time: Optional[str],
+               area: str,
+               tide_type: str,
+               tide_height: Optional[float],
+               temperature: Optional[float],
+               wind_direction: Optional[str],
+               lure: Optional[str],
+               action: Optional[str],
+               size: Optional[float],
+               image_url1: Optional[str] = None,
+               image_url2: Optional[str] = None,
+               image_url3: Optional[str] = None,
+               bait_pattern: Optional[str] = None,
+               ) -> None:
+    res = insert_rows([dict(
+        date=date, time=time, area=area, tide_type=tide_type,
+        tide_height=tide_height, temperature=temperature,
+        wind_direction=wind_direction, lure=lure, action=action, size=size,
+        image_url1=image_url1, image_url2=image_url2, image_url3=image_url3,
+        bait_pattern=bait_pattern,
+    )])[0]
+    _raise_on_error(res)
+
+def update_row(row_id: int,
+               area: str,
+               tide_type: str,
+               temperature: Optional[float],
+               wind_direction: Optional[str],
+               lure: Optional[str],
+               action: Optional[str],
+               size: Optional[float],
+               tide_height: Optional[float],
+               time: Optional[str],
+               image_url1: Optional[str] = None,
+               image_url2: Optional[str] = None,
+               image_url3: Optional[str] = None,
+               bait_pattern: Optional[str] = None,
+               ) -> None:
+    res = update_rows([dict(
+        row_id=row_id, area=area, tide_type=tide_type, temperature=temperature,
+        wind_direction=wind_direction, lure=lure, action=action, size=size,
+        tide_height=tide_height, time=time,
+        image_url1=image_url1, image_url2=image_url2, image_url3=image_url3,
+        bait_pattern=bait_pattern,
+    )])[0]
+    _raise_on_error(res)
 
-def fetch_all():
-    with get_conn() as conn:
-        return pd.read_sql("SELECT * FROM fishing_log ORDER BY date DESC, id DESC", conn)
+def delete_row(row_id: int) -> None:
+    res = delete_rows([row_id])[0]
+    _raise_on_error(res)
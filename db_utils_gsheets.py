@@ -1,12 +1,26 @@
 # db_utils_gsheets.py
 import gspread
+from datetime import datetime
 from google.oauth2.service_account import Credentials
 import streamlit as st
 import pandas as pd
 from typing import Optional
+import logging
+import re
+import threading
+import time as _time
 import cloudinary
 import cloudinary.uploader
 
+from data_cache import bump_version
+from db_mirror import SheetMirror
+from log_query import ORDER_BY, where_clause
+from log_schema import COLUMNS, DEFAULT_BAIT, DEFAULT_TIME, to_df as _to_df
+from log_snapshot import cached_frame
+from perf import timed
+
+logger = logging.getLogger(__name__)
+
 @st.cache_resource(show_spinner=False)
 def _init_cloudinary():
     cfg = st.secrets["cloudinary"]
@@ -19,10 +33,22 @@ def _init_cloudinary():
     return True
 
 
-# 列定義（ヘッダ順を固定）
-COLUMNS = ["id","date","time","area","tide_type","tide_height","temperature",
-           "wind_direction","lure","action","size","image_url1","image_url2","image_url3","bait_pattern"]
+# 列定義（ヘッダ順）は log_schema.COLUMNS
 SHEET_NAME = "logs"  # シート名は好きに
+ID_SEQ_SHEET_NAME = "id_seq"  # ID 採番用（1行追記＝1ID、B 列はその行の ID の下限、C1 はログ上の最大 ID）
+_ID_SEQ_HEADER = ["allocated_at", "min_id", f"=MAX('{SHEET_NAME}'!A2:A)"]
+_LAST_COL = chr(ord("A") + len(COLUMNS) - 1)  # "O"
+
+# ローカルミラーの差分同期間隔（秒）。読み出し自体は常にミラーから行う
+MIRROR_SYNC_INTERVAL_SEC = 60
+# バックグラウンド同期に失敗したら、次の自動同期まで待つ秒数（失敗が続くたびに倍、上限 SYNC_BACKOFF_MAX_SEC）
+SYNC_BACKOFF_BASE_SEC = 30
+SYNC_BACKOFF_MAX_SEC = 15 * 60
+
+# バッチ書き込み 1 リクエストあたりの最大行数（Sheets API のペイロード上限対策）
+BATCH_CHUNK_ROWS = 500
+# 確認読みで batch_get 1 回にまとめる最大レンジ数（URL 長の上限対策）
+_READ_CHUNK_RANGES = 100
 
 @st.cache_resource(show_spinner=False)
 def _ws():
@@ -47,41 +73,429 @@ def _ws():
         ws.update("A1", [COLUMNS])
     return ws
 
-def _to_df(rows: list[list[str]]) -> pd.DataFrame:
-    if not rows:
-        return pd.DataFrame(columns=COLUMNS)
+@st.cache_resource(show_spinner=False)
+def _mirror() -> SheetMirror:
+    return SheetMirror(COLUMNS)
 
-    normalized_rows: list[list[str]] = []
-    col_count = len(COLUMNS)
+_sync_lock = threading.Lock()
 
-    for r in rows:
-        # 行の列数が少ない → 足りない分を "" で埋める
-        if len(r) < col_count:
-            r = r + [""] * (col_count - len(r))
-        # 多い場合（将来レイアウトを変えたとき用）は切り捨て
-        elif len(r) > col_count:
-            r = r[:col_count]
-        normalized_rows.append(r)
+def resync_from_sheet() -> int:
+    """シートを全件取り直してミラーを作り直す（復旧用）。取り込んだ行数を返す"""
+    ws = _ws()
+    m = _mirror()
+    with _sync_lock:
+        vals = ws.get_all_values()
+        rows = vals[1:] if len(vals) > 1 else []
+        with m.locked():
+            m.replace_all(rows)
+            bump_version()
+    return len(rows)
 
-    df = pd.DataFrame(normalized_rows, columns=COLUMNS)
+def sync_from_sheet() -> int:
+    """
+    最後に把握している行数より後ろ（＝他端末で追記された行）だけを取り込む。
+    シート側での削除・書き換えは拾えないので、その場合は resync_from_sheet を使う。
+    """
+    ws = _ws()
+    m = _mirror()
+    with _sync_lock:
+        known = m.sheet_row_count()
+        vals = ws.get(f"A{known + 2}:{_LAST_COL}")
+        new_rows = [r for r in vals if any(str(v).strip() for v in r)]
+        with m.locked():
+            m.append_rows(new_rows)
+            m.mark_synced()
+            if new_rows:
+                bump_version([(None, _as_record(r)) for r in new_rows])
+    return len(new_rows)
+
+def _as_record(row: list[str]) -> dict:
+    """行の値 → 列名つき dict（data_cache の変更通知用）"""
+    return dict(zip(COLUMNS, _pad_row(row)))
 
-    df["id"] = pd.to_numeric(df["id"], errors="coerce").astype("Int64")
-    for col in ["tide_height", "temperature", "size"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    return df
+# バックグラウンド同期の状態（_bg_lock で守る）
+_bg_lock = threading.Lock()
+_bg = {"pending": False, "failures": 0, "retry_at": 0.0}
 
+def _in_background(fn, *, periodic: bool = False) -> None:
+    """
+    fn をデーモンスレッドで動かす。失敗はログに残し、連続失敗の回数に応じて次の自動同期を遅らせる。
+    periodic は _sync_in_background からの自動同期（終わったら _bg["pending"] を下ろす）
+    """
+    def _run():
+        try:
+            fn()
+        except Exception:
+            with _bg_lock:
+                _bg["failures"] += 1
+                wait = min(SYNC_BACKOFF_BASE_SEC * 2 ** (_bg["failures"] - 1), SYNC_BACKOFF_MAX_SEC)
+                _bg["retry_at"] = _time.time() + wait
+                failures = _bg["failures"]
+            logger.warning("シートとの同期（%s）に失敗しました（%d 回連続、次の自動同期は %d 秒後）",
+                           fn.__name__, failures, wait, exc_info=True)
+        else:
+            with _bg_lock:
+                _bg["failures"] = 0
+                _bg["retry_at"] = 0.0
+        finally:
+            if periodic:
+                with _bg_lock:
+                    _bg["pending"] = False
+    threading.Thread(target=_run, daemon=True).start()
+
+def _sync_in_background() -> None:
+    """差分同期を裏で1本だけ走らせる（実行中・失敗後の待ち時間中は何もしない）"""
+    with _bg_lock:
+        if _bg["pending"] or _sync_lock.locked() or _time.time() < _bg["retry_at"]:
+            return
+        _bg["pending"] = True
+    _in_background(sync_from_sheet, periodic=True)
+
+def _locate_rows(row_ids: list[int]) -> dict[int, tuple[int, list[str]]]:
+    """
+    id → (シート上の行番号, その行の現在値)。
+    ミラーの行インデックスで行番号を引き、その行だけを batch_get でまとめて読んで id が一致するか確かめる。
+    一致しないものは（他端末での削除などで行がずれている）ID 列から探し直し、ミラーは後で取り直す。
+    見つからなかった id は結果に含まれない。
+    呼び出し側で _ensure_mirror() を済ませ、_sync_lock を取っておくこと。
+    """
+    ws = _ws()
+    idx = _mirror().row_index()
+    found: dict[int, tuple[int, list[str]]] = {}
+
+    def _read(targets: list[tuple[int, int]], verify: bool) -> None:
+        for chunk in _chunks(targets, _READ_CHUNK_RANGES):
+            vals = ws.batch_get([f"A{r}:{_LAST_COL}{r}" for _, r in chunk])
+            for (rid, r), v in zip(chunk, vals):
+                row = v[0] if v else []
+                if not verify or (row and row[0] == str(rid)):
+                    found[rid] = (r, _pad_row(row))
+
+    _read([(rid, idx[str(rid)]) for rid in row_ids if str(rid) in idx], verify=True)
+
+    missing = [rid for rid in row_ids if rid not in found]
+    if missing:
+        ids = ws.col_values(1)
+        pos = {v: i for i, v in enumerate(ids, start=1) if i > 1}  # 1-indexed（ヘッダが1行目）
+        targets = [(rid, pos[str(rid)]) for rid in missing if str(rid) in pos]
+        if targets:
+            _in_background(resync_from_sheet)
+            _read(targets, verify=False)
+    return found
+
+def _pad_row(row: list[str]) -> list[str]:
+    n = len(COLUMNS)
+    return (list(row) + [""] * n)[:n]
+
+def _ensure_mirror() -> SheetMirror:
+    m = _mirror()
+    if not m.is_initialized():
+        resync_from_sheet()
+    return m
 
 def fetch_all() -> pd.DataFrame:
+    m = _ensure_mirror()
+    if _time.time() - m.last_synced_at() >= MIRROR_SYNC_INTERVAL_SEC:
+        # 読み出しはシートの応答を待たない（差分は次回以降に反映）
+        _sync_in_background()
+    # データバージョンが変わらない限り同じ DataFrame を使い回す（呼び出し側が書き換えてもいいようにコピーを返す）
+    return cached_frame("gsheets.fetch_all", _load_from_mirror).copy()
+
+def fetch_range(start, end) -> pd.DataFrame:
+    """date が start〜end（両端含む）のレコード。シートには範囲検索が無いのでミラーの全件から絞る"""
+    df = fetch_all()
+    mask = df["date_dt"].between(pd.Timestamp(start), pd.Timestamp(end))
+    return df[mask].reset_index(drop=True)
+
+def search_rows(filters: dict, limit: int, offset: int = 0) -> tuple[pd.DataFrame, int]:
+    """
+    編集タブの検索。filters は log_query.where_clause のキーワード引数。
+    ミラーのインデックスで絞り込み、1ページ分の DataFrame と条件に合う全件数を返す。
+    """
+    where, params = where_clause(**filters)
+    rows, total = _ensure_mirror().search(where, params, ORDER_BY, limit, offset)
+    return _to_df(rows), total
+
+def distinct_values(column: str) -> list[str]:
+    """検索の選択肢用（空文字を除いた値の一覧）"""
+    return _ensure_mirror().distinct(column)
+
+def _load_from_mirror() -> pd.DataFrame:
+    rows = _mirror().read_rows()
+    return _to_df(rows)
+
+def _appended_row_number(resp) -> Optional[int]:
+    """append 系 API の応答（updatedRange: 'logs!A10:O10'）から先頭行番号を取り出す"""
+    try:
+        rng = resp["updates"]["updatedRange"]
+    except (TypeError, KeyError):
+        return None
+    m = re.search(r"![A-Z]+(\d+)", rng)
+    return int(m.group(1)) if m else None
+
+@st.cache_resource(show_spinner=False)
+def _id_seq_ws():
+    sh = _ws().spreadsheet
+    try:
+        ws = sh.worksheet(ID_SEQ_SHEET_NAME)
+    except gspread.WorksheetNotFound:
+        ws = sh.add_worksheet(title=ID_SEQ_SHEET_NAME, rows="1000", cols="3")
+    if ws.col_count < 3:  # 下限列・最大 ID のセルが無い古い採番シート
+        ws.add_cols(3 - ws.col_count)
+    if ws.get("A1:C1", value_render_option="FORMULA") != [_ID_SEQ_HEADER]:
+        ws.update("A1:C1", [_ID_SEQ_HEADER], value_input_option="USER_ENTERED")
+    return ws
+
+# 採番シートをどこまで読んだか：(行番号, その行の ID)。1 行目はヘッダで ID 0 扱い。
+# 同じプロセス内の採番は _id_lock で1つずつ行うので、読んだ位置は追記のたびに前へ進むだけ
+_id_lock = threading.Lock()
+_id_scan: tuple[int, int] = (1, 0)
+
+def _cell_int(v, default: Optional[int] = None) -> Optional[int]:
+    try:
+        return int(float(v))
+    except (TypeError, ValueError):
+        return default
+
+def _append_id_rows(ws, n: int, min_id: Optional[int] = None) -> int:
+    """採番シートに n 行追記して先頭の行番号を返す。min_id があれば先頭行の B 列に下限として書く"""
+    stamp = datetime.now().isoformat(timespec="seconds")
+    rows = [[stamp] for _ in range(n)]
+    if min_id is not None:
+        rows[0] = [stamp, str(min_id)]
+    resp = ws.append_rows(rows, value_input_option="RAW", table_range="A1")
+    first = _appended_row_number(resp)
+    if first is None:
+        raise RuntimeError(f"ID の採番に失敗しました: {resp}")
+    return first
+
+def _ids_for_rows(ws, first: int, n: int, min_id: Optional[int] = None) -> tuple[list[int], int]:
+    """
+    first 行目から n 行の ID と、ログ上の最大 ID（C1）を返す。
+    前回読んだ位置から first の手前までの B 列（他端末が書いた下限）を C1 と一緒に 1 回で読み足す。
+    """
+    global _id_scan
+    row, last = _id_scan
+    if row >= first:  # 採番シートの行が手で消された → 最初から数え直す
+        row, last = 1, 0
+    ranges = ["C1"] + ([f"B{row + 1}:B{first - 1}"] if first - 1 > row else [])
+    got = ws.batch_get(ranges)
+    max_id = _cell_int(got[0][0][0] if got[0] and got[0][0] else None, 0)
+    floors = got[1] if len(got) > 1 else []
+    for i in range(first - 1 - row):
+        floor = _cell_int(floors[i][0]) if i < len(floors) and floors[i] else None
+        last = max(floor or 0, last + 1)
+    ids = []
+    for i in range(n):
+        last = max(min_id or 0, last + 1) if i == 0 else last + 1
+        ids.append(last)
+    _id_scan = (first + n - 1, last)
+    return ids, max_id
+
+def _next_ids(n: int = 1) -> list[int]:
+    """
+    採番シートに n 行追記し、追記された行の位置から ID を決める。
+    各行の ID は「1 つ前の行の ID + 1」、B 列に下限が書かれた行はそれ以上に飛ばす
+    （下限の無い行だけなら ID = 行番号 - 1）。
+    追記は Sheets 側で直列化され、ID は行の並びだけで決まるので、複数端末から同時に採番しても重複しない。
+    ログ全体は読まず、読むのは前回の採番以降に増えた採番シートの行だけ。
+    採番シートは払い出した ID の数だけ行が増え続ける（ログ本体の1行 15 セルに対して 1〜2 セルなので、
+    シートのセル数の上限にはログ本体が先に当たる）。
+    """
+    ws = _id_seq_ws()
+    with _id_lock:
+        first = _append_id_rows(ws, n)
+        ids, max_id = _ids_for_rows(ws, first, n)
+        if ids[0] <= max_id:
+            # 採番がログ上の最大 ID より遅れている（シートを手で編集した等）→ 下限つきの行で取り直す。
+            # 追記済みの行を後から書き換えると他端末の ID までずれるので、さっきの n 個は欠番にする
+            first = _append_id_rows(ws, n, min_id=max_id + 1)
+            ids, _ = _ids_for_rows(ws, first, n, min_id=max_id + 1)
+    return ids
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _result(row_id: Optional[int], status: str = "ok", error: Optional[Exception] = None) -> dict:
+    """バッチ API の1件ごとの結果。status は "ok" / "not_found" / "error" """
+    return {"id": row_id, "status": status, "error": error}
+
+def _raise_on_error(res: dict) -> None:
+    if res["status"] == "error":
+        raise res["error"]
+
+def _build_insert_values(new_id: int,
+                         date: str,
+                         time: Optional[str],
+                         area: str,
+                         tide_type: str,
+                         tide_height: Optional[float],
+                         temperature: Optional[float],
+                         wind_direction: Optional[str],
+                         lure: Optional[str],
+                         action: Optional[str],
+                         size: Optional[float],
+                         image_url1: Optional[str] = None,
+                         image_url2: Optional[str] = None,
+                         image_url3: Optional[str] = None,
+                         bait_pattern: Optional[str] = None,
+                         ) -> list[str]:
+    return [
+        str(new_id),
+        date or "",
+        (time or DEFAULT_TIME),
+        area or "",
+        tide_type or "",
+        "" if tide_height is None else str(tide_height),
+        "" if temperature is None else str(temperature),
+        wind_direction or "",
+        lure or "",
+        action or "",
+        "" if size is None else str(size),
+        image_url1 or "",
+        image_url2 or "",
+        image_url3 or "",
+        bait_pattern or DEFAULT_BAIT,
+    ]
+
+def insert_rows(records: list[dict]) -> list[dict]:
+    """
+    複数レコードをまとめて追加する。各 record は insert_row と同じキーワードの dict。
+    BATCH_CHUNK_ROWS 件ごとに「採番 1 回 + append_rows 1 回」で書き込む。
+    戻り値は records と同じ順の結果（{"id", "status", "error"}）。
+    """
     ws = _ws()
-    vals = ws.get_all_values()
-    if len(vals) <= 1:
-        return pd.DataFrame(columns=COLUMNS)
-    return _to_df(vals[1:])
+    m = _ensure_mirror()
+    records = list(records)
+    results: list[Optional[dict]] = [None] * len(records)
+    need_sync = need_resync = False
+
+    # 先に値を組み立てて、キーの間違いなどはその行だけエラーにする
+    valid: list[int] = []
+    for i, rec in enumerate(records):
+        try:
+            _build_insert_values(0, **rec)
+            valid.append(i)
+        except Exception as e:
+            results[i] = _result(None, "error", e)
+
+    for chunk in _chunks(valid, BATCH_CHUNK_ROWS):
+        try:
+            ids = _next_ids(len(chunk))
+            rows = [_build_insert_values(new_id, **records[i]) for new_id, i in zip(ids, chunk)]
+            with _sync_lock:
+                resp = ws.append_rows(rows, value_input_option="USER_ENTERED")
+                # ミラーへも書き込む
+                appended = _appended_row_number(resp)
+                expected = m.sheet_row_count() + 2
+                if appended == expected:
+                    with m.locked():  # 書き込みと変更通知を読み出しから不可分に
+                        m.append_rows(rows)
+                        bump_version([(None, _as_record(r)) for r in rows])
+            if appended is None or appended < expected:
+                # ミラーより手前に追記された（他端末の削除でシートが短くなった）→ 差分同期では拾えない
+                need_resync = True
+            elif appended > expected:
+                need_sync = True
+            for new_id, i in zip(ids, chunk):
+                results[i] = _result(new_id)
+        except Exception as e:
+            for i in chunk:
+                results[i] = _result(None, "error", e)
+
+    if need_resync:
+        # 差分同期はミラーの行数より後ろしか読まないので、全件取り直す（変更通知もそちらで出る）
+        resync_from_sheet()
+    elif need_sync:
+        # ミラーより後ろに追記された（＝他端末の追記がある）→ 差分同期でまとめて取り込む（変更通知もそちらで出る）
+        sync_from_sheet()
+    return results
 
-def _next_id(df: pd.DataFrame) -> int:
-    if df.empty or df["id"].isna().all():
-        return 1
-    return int(df["id"].max()) + 1
+def update_rows(records: list[dict]) -> list[dict]:
+    """
+    複数レコードをまとめて更新する。各 record は row_id を含む、update_row と同じキーワードの dict。
+    BATCH_CHUNK_ROWS 件ごとに「確認読み batch_get + batch_update」で書き込む。
+    戻り値は records と同じ順の結果（{"id", "status", "error"}）。
+    """
+    ws = _ws()
+    m = _ensure_mirror()
+    records = list(records)
+    results: list[Optional[dict]] = [None] * len(records)
+
+    with _sync_lock:  # 行の特定から書き込みまでの間に行がずれないように
+        for chunk in _chunks(list(range(len(records))), BATCH_CHUNK_ROWS):
+            try:
+                found = _locate_rows([records[i]["row_id"] for i in chunk])
+                data, done = [], []
+                for i in chunk:
+                    rid = records[i]["row_id"]
+                    if rid not in found:
+                        results[i] = _result(rid, "not_found")
+                        continue
+                    r, existing = found[rid]
+                    try:
+                        values = _build_update_values(existing=existing, **records[i])
+                    except Exception as e:
+                        results[i] = _result(rid, "error", e)
+                        continue
+                    data.append({"range": f"A{r}:{_LAST_COL}{r}", "values": [values]})
+                    done.append((i, rid, values))
+                if data:
+                    ws.batch_update(data, value_input_option="USER_ENTERED")
+                    with m.locked():
+                        changed = m.update_rows([(rid, values) for _, rid, values in done])
+                        bump_version([(_as_record(old), _as_record(new)) for old, new in changed])
+                for i, rid, _ in done:
+                    results[i] = _result(rid)
+            except Exception as e:
+                for i in chunk:
+                    if results[i] is None:
+                        results[i] = _result(records[i].get("row_id"), "error", e)
+
+    return results
+
+def delete_rows(row_ids: list[int]) -> list[dict]:
+    """
+    複数レコードをまとめて削除する。
+    行の特定は batch_get 1回、削除は deleteDimension をまとめた batch_update 1回（BATCH_CHUNK_ROWS 件ごと）。
+    戻り値は row_ids と同じ順の結果（{"id", "status", "error"}）。
+    """
+    ws = _ws()
+    m = _ensure_mirror()
+    row_ids = list(row_ids)
+    status: dict[int, dict] = {}
+
+    with _sync_lock:  # 行がずれる間に差分同期が走らないように
+        try:
+            found = _locate_rows(row_ids)
+        except Exception as e:
+            return [_result(rid, "error", e) for rid in row_ids]
+        for rid in row_ids:
+            if rid not in found:
+                status[rid] = _result(rid, "not_found")
+
+        # 下の行から消せば、同じバッチ内の他の行番号はずれない
+        targets = sorted(found.items(), key=lambda kv: kv[1][0], reverse=True)
+        for chunk in _chunks(targets, BATCH_CHUNK_ROWS):
+            requests = [
+                {"deleteDimension": {"range": {
+                    "sheetId": ws.id, "dimension": "ROWS", "startIndex": r - 1, "endIndex": r,
+                }}}
+                for _, (r, _) in chunk
+            ]
+            try:
+                ws.spreadsheet.batch_update({"requests": requests})
+                with m.locked():
+                    removed = m.delete_rows([rid for rid, _ in chunk])
+                    bump_version([(_as_record(old), None) for old in removed])
+                for rid, _ in chunk:
+                    status[rid] = _result(rid)
+            except Exception as e:
+                for rid, _ in chunk:
+                    status[rid] = _result(rid, "error", e)
+
+    return [status[rid] for rid in row_ids]
 
 # 既存のシグネチャに合わせる（fishing_log_app.py の呼び出しを変えない）
 def insert_row(date: str, 
@@ -99,27 +513,14 @@ def insert_row(date: str,
                 image_url3: Optional[str] = None,
                 bait_pattern: Optional[str] = None,
                ) -> None:
-    ws = _ws()
-    df = fetch_all()
-    new_id = _next_id(df)
-    row = [
-        str(new_id),
-        date or "",
-        (time or "00:00"),
-        area or "",
-        tide_type or "",
-        "" if tide_height is None else str(tide_height),
-        "" if temperature is None else str(temperature),
-        wind_direction or "",
-        lure or "",
-        action or "",
-        "" if size is None else str(size),
-        image_url1 or "",
-        image_url2 or "",
-        image_url3 or "",
-        bait_pattern or "その他/不明",
-    ]
-    ws.append_row(row, value_input_option="USER_ENTERED")
+    res = insert_rows([dict(
+        date=date, time=time, area=area, tide_type=tide_type,
+        tide_height=tide_height, temperature=temperature,
+        wind_direction=wind_direction, lure=lure, action=action, size=size,
+        image_url1=image_url1, image_url2=image_url2, image_url3=image_url3,
+        bait_pattern=bait_pattern,
+    )])[0]
+    _raise_on_error(res)
 
 def update_row(row_id: int, 
                 area: str, 
@@ -136,19 +537,27 @@ def update_row(row_id: int,
                 image_url3: Optional[str] = None,
                 bait_pattern: Optional[str] = None,
                ) -> None:
-    ws = _ws()
-    ids = ws.col_values(1)
-    try:
-        r = ids.index(str(row_id)) + 1  # 1-indexed（ヘッダが1行目）
-    except ValueError:
-        return  # 見つからなければ何もしない（必要なら例外でもOK）
+    # 見つからなければ何もしない（必要なら例外でもOK）
+    res = update_rows([dict(
+        row_id=row_id, area=area, tide_type=tide_type, temperature=temperature,
+        wind_direction=wind_direction, lure=lure, action=action, size=size,
+        tide_height=tide_height, time=time,
+        image_url1=image_url1, image_url2=image_url2, image_url3=image_url3,
+        bait_pattern=bait_pattern,
+    )])[0]
+    _raise_on_error(res)
 
+def _build_update_values(row_id: int, existing: list[str], *,
+                         area, tide_type, temperature, wind_direction, lure, action,
+                         size, tide_height, time,
+                         image_url1=None, image_url2=None, image_url3=None,
+                         bait_pattern=None) -> list[str]:
     # date は既存を保持（必要なら外から渡すように拡張してOK）
-    existing_date = ws.cell(r, 2).value or ""
-    # 既存のURLを取得（12,13,14列目）
-    existing_image_url1 = ws.cell(r, 12).value or ""
-    existing_image_url2 = ws.cell(r, 13).value or ""
-    existing_image_url3 = ws.cell(r, 14).value or ""
+    existing_date = existing[1] or ""
+    # 既存のURL（12,13,14列目）
+    existing_image_url1 = existing[11] or ""
+    existing_image_url2 = existing[12] or ""
+    existing_image_url3 = existing[13] or ""
 
     def _resolve(existing: str, new: Optional[str]) -> str:
         # None → 変更なし
@@ -162,10 +571,10 @@ def update_row(row_id: int,
     final_image_url2 = _resolve(existing_image_url2, image_url2)
     final_image_url3 = _resolve(existing_image_url3, image_url3)
 
-    values = [
+    return [
         str(row_id),
         existing_date,
-        (time or "00:00"),
+        (time or DEFAULT_TIME),
         area or "",
         tide_type or "",
         "" if tide_height is None else str(tide_height),
@@ -177,60 +586,36 @@ def update_row(row_id: int,
         final_image_url1,
         final_image_url2,
         final_image_url3,
-        bait_pattern or "その他/不明",
+        bait_pattern or DEFAULT_BAIT,
     ]
-    ws.update(f"A{r}:N{r}", [values], value_input_option="USER_ENTERED")
 
 def delete_row(row_id: int) -> None:
-    ws = _ws()
-    ids = ws.col_values(1)
-    try:
-        r = ids.index(str(row_id)) + 1
-    except ValueError:
-        return
-    if r == 1:  # ヘッダ保護
-        return
-    ws.delete_rows(r)
+    res = delete_rows([row_id])[0]
+    _raise_on_error(res)
 
-def upload_image_to_drive(file, filename: str) -> str:
+@timed("cloudinary.upload", "api")
+def upload_to_cloudinary(file, public_id: str) -> str:
     """
-    Streamlit の file_uploader で受け取った file を
-    Cloudinary にアップロードして、その公開URLを返す
+    file（file-like）を public_id で Cloudinary に送り、その公開URLを返す。
+    public_id は中身のハッシュ（image_store が付ける）なので、同じ名前があれば上書きしない
     """
     _init_cloudinary()
-
-    # public_id 用に拡張子抜いたり、フォルダ分けしたり
-    import os
-    name, ext = os.path.splitext(filename)
-    public_id = f"fishing_log/{name}"
-
-    # Streamlit の UploadedFile はそのまま file-like として渡せる
     result = cloudinary.uploader.upload(
         file,
         public_id=public_id,
-        overwrite=True,
+        overwrite=False,
         resource_type="image",
     )
-
     # HTTPS の URL
     return result["secure_url"]
 
 def upload_image_to_cloudinary(file, filename: str) -> str:
     """
     Streamlit の file_uploader で受け取った file を
-    Cloudinary にアップロードして、その公開URLを返す
+    Cloudinary にアップロードして、その公開URLを返す（名前は中身のハッシュ。同じ画像は送り直さない）
     """
-    _init_cloudinary()
-
-    import os
-    name, ext = os.path.splitext(filename)
-    public_id = f"fishing_log/{name}"
+    from image_store import save_images
+    return save_images([(file, filename)], store="cloudinary")[0].url
 
-    result = cloudinary.uploader.upload(
-        file,
-        public_id=public_id,
-        overwrite=True,
-        resource_type="image",
-    )
-
-    return result["secure_url"]
+# 旧名（中身はずっと Cloudinary だった）
+upload_image_to_drive = upload_image_to_cloudinary
@@ -1,10 +1,85 @@
 # edit_tab.py
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 from datetime import datetime
+from typing import NamedTuple, Optional
 
+import data_cache
+
+from image_store import full_url, save_images, thumbnail_url, upload_report
+from perf import timed
+
+# ===== 表示用の前処理（UI に依存しない。bench からも呼ぶ） =====
+
+class LogView(NamedTuple):
+    df: pd.DataFrame        # 並べ替え済みの全行（index は 0 からの行位置）
+    pos: dict[int, int]     # ID → df の行位置
+    caught: np.ndarray      # 釣れた行の位置（昇順）
+
+def _sorted_log(df: pd.DataFrame) -> pd.DataFrame:
+    """並び順：日付 desc、時間 asc（近い釣行がまとまる）。date_dt / time_dt は fetch_all でパース済み"""
+    d = df.sort_values(by=["date_dt", "time_dt"], ascending=[False, True], na_position="last")
+    return d.reset_index(drop=True)
+
+def _build_view(df: pd.DataFrame) -> LogView:
+    d = _sorted_log(df)
+    ids = pd.to_numeric(d["id"], errors="coerce").fillna(-1).astype(int).to_numpy()
+    size = pd.to_numeric(d["size"], errors="coerce").fillna(0).to_numpy()
+    return LogView(d, dict(zip(ids.tolist(), range(len(d)))), np.flatnonzero(size > 0))
+
+def _log_view(df: pd.DataFrame) -> LogView:
+    # データバージョンごとに1回だけ並べ替え、一覧とブログで共有する（共有オブジェクトなので書き換えないこと）
+    return data_cache.get_or_load("edit.log_view", lambda: _build_view(df))
+
+def _view_page(view: LogView, after_id: Optional[int], limit: int,
+               only_catch: bool) -> tuple[pd.DataFrame, Optional[int]]:
+    """
+    after_id の次の行から limit 件と、次のページのカーソル（最後の行の ID。続きがなければ None）。
+    after_id=None は先頭から。after_id の行が消えていたら先頭に戻る。
+    コストはページの件数ぶんだけで、全体の件数によらない。日付見出し用の date_str 付き
+    """
+    start = 0 if after_id is None else view.pos.get(int(after_id), -1) + 1
+    if only_catch:
+        i = int(np.searchsorted(view.caught, start))
+        rows = view.caught[i:i + int(limit)]
+        more = i + int(limit) < len(view.caught)
+    else:
+        rows = np.arange(start, min(start + int(limit), len(view.df)))
+        more = start + int(limit) < len(view.df)
+
+    page = view.df.take(rows)
+    page = page.assign(date_str=page["date_dt"].dt.strftime("%Y-%m-%d"))
+    cursor = int(pd.to_numeric(page["id"].iloc[-1], errors="coerce")) if more and len(page) else None
+    return page, cursor
+
+def _has_image(d: pd.DataFrame) -> np.ndarray:
+    """画像URLが1つでもある行（列ごとにまとめて判定）"""
+    has = np.zeros(len(d), dtype=bool)
+    for c in ("image_url1", "image_url2", "image_url3"):
+        has |= d[c].fillna("").astype(str).str.strip().ne("").to_numpy()
+    return has
+
+def _log_list_frame(d: pd.DataFrame) -> pd.DataFrame:
+    """一覧（選択ボックス）用の表"""
+    # 一覧は最小限：URL列は出さない
+    list_df = d[["id", "date", "time", "area", "size"]].copy()
+    list_df["画像"] = np.where(_has_image(d), "あり", "—")
+    list_df = list_df.rename(columns={"id": "ID", "date": "日付", "time": "時間", "area": "エリア", "size": "サイズ"})
+    return list_df
+
+def _row_labels(list_df: pd.DataFrame) -> list[str]:
+    """行位置順の選択ボックスの表示文字列（列ごとに文字列を連結して一度に作る）。
+    ID は重複や読めない値（-1）があり得るので、選択は行位置で持つ"""
+    s = lambda c: list_df[c].astype(str)
+    labels = (s("日付") + " " + s("時間") + " | " + s("エリア") + " | "
+              + s("サイズ") + "cm | 画像:" + s("画像"))
+    return labels.tolist()
+
+
+@timed("edit.blog_list")
 def render_blog_detail_list(df: pd.DataFrame):
     if df is None or df.empty:
         st.info("データがありません。")
@@ -14,12 +89,6 @@ def render_blog_detail_list(df: pd.DataFrame):
         st.session_state["blog_show_images"] = False
 
     # st.warning("✅ edit_tab.render_edit_tab が呼ばれています（デバッグ表示）")
-    # 並び順：日付 desc、時間 asc（近い釣行がまとまる）
-    d = df.copy()
-    d["date_dt"] = pd.to_datetime(d["date"], errors="coerce")
-    d["time_dt"] = pd.to_datetime(d["time"], format="%H:%M", errors="coerce")
-    d = d.sort_values(by=["date_dt", "time_dt"], ascending=[False, True], na_position="last")
-
     st.subheader("📚 詳細一覧（ブログ形式）")
 
     # 表示件数を絞れるとスマホで軽い＆探しやすい
@@ -31,22 +100,33 @@ def render_blog_detail_list(df: pd.DataFrame):
     with c3:
         show_images = st.toggle("画像を表示", key="blog_show_images")
 
-    if only_catch:
-        d["size_num"] = pd.to_numeric(d["size"], errors="coerce").fillna(0)
-        d = d[d["size_num"] > 0]
+    # 表示件数・絞り込みが変わったら先頭から。blog_cursors は各ページの開始カーソル（前のページの最後の ID）
+    qkey = (limit, only_catch)
+    if st.session_state.get("blog_q_last") != qkey:
+        st.session_state["blog_q_last"] = qkey
+        st.session_state["blog_cursors"] = [None]
+    cursors = st.session_state["blog_cursors"]
 
-    d = d.head(int(limit))
+    d, next_cursor = _view_page(_log_view(df), cursors[-1], limit, only_catch)
+    if d.empty:
+        st.info("表示できる記録がありません。")
 
     # 日付ごとにまとまるようにグルーピング
-    d["date_str"] = d["date_dt"].dt.strftime("%Y-%m-%d")
     for date_str, g in d.groupby("date_str", sort=False):
         st.markdown(f"### 📅 {date_str}")
-        for _, row in g.iterrows():
+        for row in g.to_dict("records"):
             _render_one_blog_card(row, show_images=show_images)
         st.divider()
 
+    c1, c2, c3 = st.columns([1, 1, 1])
+    c1.button("◀ 前へ", key="blog_prev", disabled=len(cursors) == 1,
+              on_click=lambda: cursors.pop())
+    c2.caption(f"{len(cursors)} ページ目")
+    c3.button(f"次の {limit} 件 ▶", key="blog_next", disabled=next_cursor is None,
+              on_click=lambda: cursors.append(next_cursor))
+
 
-def _render_one_blog_card(row: pd.Series, show_images: bool = True):
+def _render_one_blog_card(row: dict, show_images: bool = True):
     # 見出し（サッと把握）
     time = row.get("time") or "—"
     area = row.get("area") or "—"
@@ -65,7 +145,7 @@ def _render_one_blog_card(row: pd.Series, show_images: bool = True):
             if urls:
                 # スマホでも見やすいように横並びより「1枚ずつ」優先
                 for i, u in enumerate(urls, start=1):
-                    st.image(u, caption=f"画像{i}", use_container_width=True)
+                    _show_image(u, f"画像{i}", key=f"blog_full_{row.get('id')}_{i}")
             else:
                 st.caption("📷 画像なし")
 
@@ -88,6 +168,12 @@ def _render_one_blog_card(row: pd.Series, show_images: bool = True):
 
 
 
+def _show_image(url: str, caption: str, *, key: str) -> None:
+    """サムネイルを出し、「元の画像」をオンにしたときだけ元画像を読み込む"""
+    full = st.toggle("🔍 元の画像", key=key)
+    st.image(full_url(url) if full else thumbnail_url(url), caption=caption, use_container_width=True)
+
+
 def _fmt_num(v, unit: str, digits: int = 0) -> str:
     try:
         if v is None or (isinstance(v, float) and pd.isna(v)):
@@ -98,6 +184,7 @@ def _fmt_num(v, unit: str, digits: int = 0) -> str:
     except Exception:
         return "—"
 
+@timed("edit.add_form")
 def render_add_form(*, TIDE736_PORTS=None, insert_row=None, get_tide_height_for_time=None, **kwargs):
     st.subheader("🆕 新規釣行ログ追加")
     
@@ -143,15 +230,10 @@ def render_add_form(*, TIDE736_PORTS=None, insert_row=None, get_tide_height_for_
     if st.button("💾 追加する", use_container_width=True):
         with st.spinner("保存中..."):
             
-            # 画像のアップロード処理（画像がある場合のみCloudinaryへ）
-            try:
-                from db_utils_gsheets import upload_image_to_cloudinary
-                url1 = upload_image_to_cloudinary(img1, img1.name) if img1 else ""
-                url2 = upload_image_to_cloudinary(img2, img2.name) if img2 else ""
-                url3 = upload_image_to_cloudinary(img3, img3.name) if img3 else ""
-            except ImportError:
-                url1, url2, url3 = "", "", ""
-                st.warning("画像アップロード関数が見つかりませんでした。")
+            # 画像の保存（画像がある場合のみ。縮小してから同時に送る。保存先は image_store の設定）
+            results = save_images([(img, img.name) if img else None for img in (img1, img2, img3)])
+            url1, url2, url3 = (r.url if r else "" for r in results)
+            st.session_state["upload_report"] = upload_report(results)
 
             # スプレッドシートへの保存処理
             insert_row(
@@ -174,6 +256,7 @@ def render_add_form(*, TIDE736_PORTS=None, insert_row=None, get_tide_height_for_
             st.success("釣行ログを保存しました！")
             st.rerun()  # 画面を更新してフォームをリセット
 
+@timed("edit.render")
 def render_edit_tab(*, TIDE736_PORTS=None, fetch_all=None, insert_row=None, get_tide_height_for_time=None, **_ignore):
     """
     fishing_log_app.py からキーワード引数付きで呼ばれても落ちない入口。
@@ -185,9 +268,22 @@ def render_edit_tab(*, TIDE736_PORTS=None, fetch_all=None, insert_row=None, get_
     st.header("📝 データ編集")
 
     if fetch_all is None:
-        from db_utils_gsheets import fetch_all as _fetch_all
+        from db_backend import fetch_all as _fetch_all
         fetch_all = _fetch_all
 
+    # ローカルミラーがシートとずれたとき用（他端末での削除・直接編集など）
+    from db_backend import get_backend
+    backend = get_backend()
+    if hasattr(backend, "resync_from_sheet") and st.button("🔄 シートから再同期", key="resync_from_sheet_btn"):
+        with st.spinner("シートから読み込み中..."):
+            n = backend.resync_from_sheet()
+        st.success(f"{n} 件をシートから再読み込みしました")
+
+    # 直前の保存でアップロードした画像の報告（保存後に rerun するのでここで出す）
+    report = st.session_state.pop("upload_report", None)
+    if report:
+        st.success("画像を保存しました\n\n" + "\n\n".join(report))
+
     df = fetch_all()
 
     # ① 新規追加
@@ -226,7 +322,7 @@ def _open_details_dialog(row: pd.Series, *, is_mobile: bool = True):
             if is_mobile:
                 for idx, url in enumerate(urls, start=1):
                     if isinstance(url, str) and url.strip():
-                        st.image(url, caption=f"画像{idx}", use_container_width=True)
+                        _show_image(url, f"画像{idx}", key=f"dialog_full_{int(row['id'])}_{idx}")
                     else:
                         st.caption(f"画像{idx}（なし）")
             else:
@@ -234,13 +330,13 @@ def _open_details_dialog(row: pd.Series, *, is_mobile: bool = True):
                 for idx, (url, col) in enumerate(zip(urls, [c1, c2, c3]), start=1):
                     with col:
                         if isinstance(url, str) and url.strip():
-                            st.image(url, caption=f"画像{idx}", use_container_width=True)
+                            _show_image(url, f"画像{idx}", key=f"dialog_full_{int(row['id'])}_{idx}")
                         else:
                             st.caption(f"画像{idx}（なし）")
 
         # ----------------- 編集 -----------------
         with tabs[1]:
-            from db_utils_gsheets import update_row, upload_image_to_cloudinary
+            from db_backend import update_row
 
             existing_image_url1 = row.get("image_url1", "")
             existing_image_url2 = row.get("image_url2", "")
@@ -340,7 +436,7 @@ def _open_details_dialog(row: pd.Series, *, is_mobile: bool = True):
                     )
                     delete_image1 = False
                     if existing_image_url1:
-                        st.image(existing_image_url1, caption="現在の画像1", use_container_width=True)
+                        st.image(thumbnail_url(existing_image_url1), caption="現在の画像1", use_container_width=True)
                         delete_image1 = st.checkbox(
                             "この画像1を削除する",
                             value=False,
@@ -357,7 +453,7 @@ def _open_details_dialog(row: pd.Series, *, is_mobile: bool = True):
                     )
                     delete_image2 = False
                     if existing_image_url2:
-                        st.image(existing_image_url2, caption="現在の画像2", use_container_width=True)
+                        st.image(thumbnail_url(existing_image_url2), caption="現在の画像2", use_container_width=True)
                         delete_image2 = st.checkbox(
                             "この画像2を削除する",
                             value=False,
@@ -374,7 +470,7 @@ def _open_details_dialog(row: pd.Series, *, is_mobile: bool = True):
                     )
                     delete_image3 = False
                     if existing_image_url3:
-                        st.image(existing_image_url3, caption="現在の画像3", use_container_width=True)
+                        st.image(thumbnail_url(existing_image_url3), caption="現在の画像3", use_container_width=True)
                         delete_image3 = st.checkbox(
                             "この画像3を削除する",
                             value=False,
@@ -390,27 +486,21 @@ def _open_details_dialog(row: pd.Series, *, is_mobile: bool = True):
                 if do_update:
                     time_str = time_e.strftime("%H:%M") if time_e else "00:00"
 
-                    image_url1_arg = None
-                    image_url2_arg = None
-                    image_url3_arg = None
-
-                    if delete_image1 and existing_image_url1:
-                        image_url1_arg = ""
-                    elif image_file1 is not None:
-                        filename1 = f"{row['id']}_{row['date']}_1_{image_file1.name}"
-                        image_url1_arg = upload_image_to_cloudinary(image_file1, filename1)
-
-                    if delete_image2 and existing_image_url2:
-                        image_url2_arg = ""
-                    elif image_file2 is not None:
-                        filename2 = f"{row['id']}_{row['date']}_2_{image_file2.name}"
-                        image_url2_arg = upload_image_to_cloudinary(image_file2, filename2)
-
-                    if delete_image3 and existing_image_url3:
-                        image_url3_arg = ""
-                    elif image_file3 is not None:
-                        filename3 = f"{row['id']}_{row['date']}_3_{image_file3.name}"
-                        image_url3_arg = upload_image_to_cloudinary(image_file3, filename3)
+                    # 削除 → ""、差し替え → 新しい URL、どちらでもない → None（変更しない）
+                    slots = [
+                        (delete_image1 and existing_image_url1, image_file1),
+                        (delete_image2 and existing_image_url2, image_file2),
+                        (delete_image3 and existing_image_url3, image_file3),
+                    ]
+                    uploads = [
+                        (f, f"{row['id']}_{row['date']}_{i}_{f.name}") if not delete and f is not None else None
+                        for i, (delete, f) in enumerate(slots, start=1)
+                    ]
+                    results = save_images(uploads)
+                    image_url1_arg, image_url2_arg, image_url3_arg = (
+                        "" if delete else (r.url if r else None) for (delete, _), r in zip(slots, results)
+                    )
+                    st.session_state["upload_report"] = upload_report(results)
 
                     kwargs = dict(
                         row_id=int(row["id"]),
@@ -442,7 +532,7 @@ def _open_details_dialog(row: pd.Series, *, is_mobile: bool = True):
 
         # ----------------- 削除 -----------------
         with tabs[2]:
-            from db_utils_gsheets import delete_row
+            from db_backend import delete_row
             st.warning("このレコードを削除します。元に戻せません。")
             confirm = st.checkbox("理解したうえで削除する", value=False, key=f"dialog_del_confirm_{int(row['id'])}")
             if st.button("削除を実行", type="primary", disabled=not confirm, key=f"dialog_del_btn_{int(row['id'])}"):
@@ -460,57 +550,103 @@ def _open_details_dialog(row: pd.Series, *, is_mobile: bool = True):
             _render_body()
 
 
+# 一覧の1ページの件数
+PAGE_SIZE = 20
+
+def _search_filters() -> dict:
+    """一覧の絞り込み UI → log_query.where_clause のキーワード引数"""
+    from db_backend import distinct_values
+
+    areas = data_cache.get_or_load("edit.areas", lambda: distinct_values("area"))
+    lures = data_cache.get_or_load("edit.lures", lambda: distinct_values("lure"))
+
+    with st.expander("🔎 絞り込み", expanded=False):
+        keyword = st.text_input("キーワード（エリア・ルアー・アクション・ベイトなど）", key="log_q_keyword")
+        c1, c2 = st.columns(2)
+        with c1:
+            date_from = st.date_input("開始日", value=None, key="log_q_from")
+        with c2:
+            date_to = st.date_input("終了日", value=None, key="log_q_to")
+        c3, c4 = st.columns(2)
+        with c3:
+            area = st.selectbox("エリア", ["すべて"] + areas, key="log_q_area")
+        with c4:
+            lure = st.selectbox("ルアー", ["すべて"] + lures, key="log_q_lure")
+        caught_only = st.toggle("釣れた記録だけ", value=False, key="log_q_caught")
+
+    return {
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "area": None if area == "すべて" else area,
+        "lure": None if lure == "すべて" else lure,
+        "caught_only": caught_only,
+        "keyword": keyword.strip() or None,
+    }
+
+@timed("edit.log_table")
 def render_log_table_with_actions(df: pd.DataFrame):
     if df is None or df.empty:
         st.info("データがありません。")
         return
 
-    d = df.copy()
-    d["date_dt"] = pd.to_datetime(d["date"], errors="coerce")
-    d["time_dt"] = pd.to_datetime(d["time"], format="%H:%M", errors="coerce")
-    d = d.sort_values(by=["date_dt", "time_dt"], ascending=[False, True], na_position="last")
-
     # ✅ ブログからのジャンプがあれば最優先で開く（ここは1回だけ）
     jump_id = st.session_state.pop("jump_edit_id", None)
     if jump_id is not None:
-        d["id_int"] = pd.to_numeric(d["id"], errors="coerce").fillna(-1).astype(int)
-        row = d[d["id_int"] == int(jump_id)].iloc[0]
-        _open_details_dialog(row, is_mobile=True)
-        return
-
-    # 一覧は最小限：URL列は出さない
-    d["画像"] = (
-        d[["image_url1", "image_url2", "image_url3"]]
-        .fillna("")
-        .astype(str)
-        .apply(lambda r: "あり" if any(x.strip() for x in r.values) else "—", axis=1)
-    )
-    list_df = d[["id", "date", "time", "area", "size", "画像"]].copy()
-    list_df = list_df.rename(columns={"id": "ID", "date": "日付", "time": "時間", "area": "エリア", "size": "サイズ"})
+        view = _log_view(df)
+        if int(jump_id) in view.pos:
+            _open_details_dialog(view.df.iloc[view.pos[int(jump_id)]], is_mobile=True)
+            return
 
     st.markdown("### 一覧")
     st.caption("選択してから「開く」を押すと編集/削除/プレビューが出ます")
 
-    # 選択UIは1つだけ（確実に）
-    list_df["ID_int"] = pd.to_numeric(list_df["ID"], errors="coerce").fillna(-1).astype(int)
-    options = list_df["ID_int"].tolist()
+    # 絞り込み・ページ送りはストレージ側（インデックスのある列）で行い、表示するのは1ページ分だけ
+    from db_backend import search_rows
+
+    filters = _search_filters()
+    fkey = repr(sorted(filters.items()))
+    if st.session_state.get("log_q_last") != fkey:
+        st.session_state["log_q_last"] = fkey
+        st.session_state["log_page"] = 1
+
+    page = int(st.session_state.get("log_page", 1))
+    # 同じ条件・ページ・データのままの rerun（選択の切り替えなど）では検索し直さない
+    qkey = (data_cache.data_version(), fkey, page)
+    cached = st.session_state.get("log_q_result")
+    if cached is None or cached[0] != qkey:
+        cached = (qkey, search_rows(filters, PAGE_SIZE, (page - 1) * PAGE_SIZE))
+        st.session_state["log_q_result"] = cached
+    page_df, total = cached[1]
+    if total == 0:
+        st.info("条件に合う記録がありません。")
+        return
+
+    pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
+    if page > pages:
+        st.session_state["log_page"] = pages
+        st.rerun()
+    start = (page - 1) * PAGE_SIZE
+    c1, c2 = st.columns([1, 2])
+    with c1:
+        st.number_input("ページ", min_value=1, max_value=pages, step=1, key="log_page")
+    with c2:
+        st.caption(f"{total} 件中 {start + 1}–{start + len(page_df)} 件（{pages} ページ）")
 
-    def _fmt(_id: int) -> str:
-        r = list_df[list_df["ID_int"] == _id].iloc[0]
-        return f"{r['日付']} {r['時間']} | {r['エリア']} | {r['サイズ']}cm | 画像:{r['画像']}"
+    list_df = _log_list_frame(page_df)
+    labels = _row_labels(list_df)
 
-    selected_id = st.selectbox(
+    # 選択UIは1つだけ（確実に）。値はページ内の行位置
+    selected_pos = st.selectbox(
         "レコードを選択",
-        options=options,
-        format_func=_fmt,
+        options=range(len(labels)),
+        format_func=labels.__getitem__,
         key="log_select_box",
     )
 
     is_mobile = st.toggle("📱スマホ表示（縦レイアウト）", value=True, key="edit_is_mobile")
 
     if st.button("詳細（編集/削除/プレビュー）を開く", type="primary", key="open_detail_btn"):
-        d["id_int"] = pd.to_numeric(d["id"], errors="coerce").fillna(-1).astype(int)
-        row = d[d["id_int"] == int(selected_id)].iloc[0]
+        row = page_df.iloc[selected_pos]
         _open_details_dialog(row, is_mobile=is_mobile)
 
 
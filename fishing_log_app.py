@@ -2,16 +2,21 @@
 from __future__ import annotations
 
 from datetime import datetime, date as Date
-import urllib.parse
 
 import pandas as pd
-import requests
 import streamlit as st
 
+import analysis_cube
+import data_cache
+import http_cache
+import http_client
+import log_snapshot
+import perf
 from analysis_tab import show_analysis
-from db_utils_gsheets import fetch_all, insert_row
+from db_backend import fetch_all, insert_row, migrate_on_startup
 from check_tab import render_check_tab
 from edit_tab import render_edit_tab
+from tide736 import TIDE736_PORTS, build_tide736_image_url, get_tide_height_for_time
 
 # 天気の取得ポイント
 WEATHER_POINTS = {
@@ -26,18 +31,6 @@ WEATHER_POINTS = {
     "石巻":  {"lat": 38.430, "lon": 141.300},
 }
 
-TIDE736_PORTS = {
-    "芝浦": {"pc": 13, "hc": 2},
-    "羽田": {"pc": 13, "hc": 3},
-    "銚子": {"pc": 12, "hc": 2},
-    "鴨川": {"pc": 12, "hc": 6},
-    "岩井袋": {"pc": 12, "hc": 10},
-    "横須賀": {"pc": 14, "hc": 7},
-    "江の島": {"pc": 14, "hc": 19},
-    "気仙沼": {"pc": 4, "hc": 1},
-    "石巻": {"pc": 4, "hc": 6},
-}
-
 SST_POINTS = {
     "芝浦":  {"lat": 35.640, "lon": 139.763},
     "羽田":  {"lat": 35.545, "lon": 139.781},
@@ -50,7 +43,11 @@ SST_POINTS = {
     "石巻":  {"lat": 38.430, "lon": 141.300},
 }
 
-@st.cache_data(ttl=1800, show_spinner=False)  # 30分キャッシュ
+# Open-Meteo のレスポンスのキャッシュ期間（秒）。予報は1時間ごとに更新、水温（current）は15分ごと
+WEATHER_FORECAST_TTL_SEC = 3600
+WEATHER_PAST_TTL_SEC = 7 * 24 * 3600   # 過去の日付は変わらない
+SST_TTL_SEC = 900
+
 def filter_every_3_hours(df: pd.DataFrame) -> pd.DataFrame:
     return df[df["time"].dt.hour % 3 == 0].reset_index(drop=True)
 
@@ -97,7 +94,8 @@ def wind_speed_style(val):
     else:
         return ""
 
-def fetch_weather_hourly(lat: float, lon: float, target_date: Date) -> pd.DataFrame:
+@perf.timed("open_meteo.weather_hourly")
+def fetch_weather_hourly(lat: float, lon: float, target_date: Date, timeout: float = 10) -> pd.DataFrame:
     url = "https://api.open-meteo.com/v1/forecast"
     params = {
         "latitude": lat,
@@ -113,9 +111,8 @@ def fetch_weather_hourly(lat: float, lon: float, target_date: Date) -> pd.DataFr
             "weather_code"
         ),
     }
-    r = requests.get(url, params=params, timeout=10)
-    r.raise_for_status()
-    data = r.json()["hourly"]
+    ttl = WEATHER_PAST_TTL_SEC if target_date < datetime.now().date() else WEATHER_FORECAST_TTL_SEC
+    data = http_cache.get_json(url, params, ttl=ttl, timeout=timeout)["hourly"]
     return pd.DataFrame({
         "time": pd.to_datetime(data["time"]),
         "temp": data["temperature_2m"],
@@ -125,7 +122,8 @@ def fetch_weather_hourly(lat: float, lon: float, target_date: Date) -> pd.DataFr
         "weather_code": data["weather_code"],
     })
 
-def fetch_current_sea_surface_temp(lat: float, lon: float) -> float | None:
+@perf.timed("open_meteo.sst")
+def fetch_current_sea_surface_temp(lat: float, lon: float, timeout: float = 10) -> float | None:
     url = "https://marine-api.open-meteo.com/v1/marine"
     params = {
         "latitude": lat,
@@ -134,83 +132,22 @@ def fetch_current_sea_surface_temp(lat: float, lon: float) -> float | None:
         "timezone": "Asia/Tokyo",
         "cell_selection": "sea",
     }
-    resp = requests.get(url, params=params, timeout=10)
-    resp.raise_for_status()
-    data = resp.json()
+    data = http_cache.get_json(url, params, ttl=SST_TTL_SEC, timeout=timeout)
     current = data.get("current", {})
     sst = current.get("sea_surface_temperature")
     if sst is None:
         return None
     return float(sst)
 
-@st.cache_data(show_spinner=False)
-def fetch_tide736_day(pc: int, hc: int, target_date: Date):
-    params = {
-        "pc": pc,
-        "hc": hc,
-        "yr": target_date.year,
-        "mn": target_date.month,
-        "dy": target_date.day,
-        "rg": "day",
-    }
-    resp = requests.get("https://api.tide736.net/get_tide.php", params=params, timeout=10)
-    resp.raise_for_status()
-    data = resp.json()
-
-    if data.get("status") != 1:
-        raise ValueError(f"tide736 API error: {data.get('message')}")
-
-    key = target_date.strftime("%Y-%m-%d")
-    chart = data["tide"]["chart"][key]
-    return chart["tide"]
-
-def get_tide_height_for_time(pc: int, hc: int, target_date: Date, t: datetime.time):
-    tide_list = fetch_tide736_day(pc, hc, target_date)
-    target_min = t.hour * 60 + t.minute
-    best = None
-    best_diff = 10**9
-
-    for item in tide_list:
-        hh, mm = map(int, item["time"].split(":"))
-        m = hh * 60 + mm
-        diff = abs(m - target_min)
-        if diff < best_diff:
-            best_diff = diff
-            best = item
-
-    if best is None:
-        raise ValueError("tide data not found")
-    return float(best["cm"]), best["time"]
-
-def build_tide736_image_url(
-    target_date: Date,
-    pc: int,
-    hc: int,
-    width: int = 768,
-    height: int = 320,
-) -> str:
-    base = "https://api.tide736.net/tide_image.php"
-    params = {
-        "pc": pc,
-        "hc": hc,
-        "yr": target_date.year,
-        "mn": target_date.month,
-        "dy": target_date.day,
-        "rg": "day",
-        "w": width,
-        "h": height,
-        "lc": "blue",
-        "gcs": "cyan",
-        "gcf": "blue",
-        "ld": "on",
-        "ttd": "on",
-        "tsmd": "on",
-    }
-    return base + "?" + urllib.parse.urlencode(params)
-
-
 # ===== UI 起動 =====
 st.set_page_config(page_title="釣行ログ管理", page_icon="🎣", layout="centered")
+perf.begin_rerun()
+
+# sqlite バックエンドのスキーマのマイグレーション（プロセスで1回。かかった時間は perf パネルの storage.migrate にも出る）
+migration = migrate_on_startup()
+if migration and migration["applied"]:
+    st.caption(f"🛠 DB スキーマを v{migration['from']} → v{migration['to']} に更新しました"
+               f"（{', '.join(migration['applied'])} / {migration['elapsed_ms']:.0f} ms）")
 
 tab_check, tab_edit, tab_analysis = st.tabs(["🌊 釣行前チェック", "📝 データ編集", "📈 分析"])
 
@@ -238,3 +175,11 @@ with tab_edit:
 
 with tab_analysis:
     show_analysis()
+
+# プロセス全体の統計（perf パネルに出す）
+perf.end_rerun({
+    "データキャッシュ": data_cache.cache_stats,
+    "分析キューブ": analysis_cube.cube_stats,
+    "HTTP 接続": http_client.connection_stats,
+    "起動時のスナップショット読み込み": log_snapshot.last_load_report,
+})
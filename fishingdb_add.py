@@ -1,8 +1,13 @@
+# fishingdb_add.py
+# fishing_log.db のスキーマを最新にする（何度実行しても OK）
 import sqlite3
+
+from db_migrations import migrate
+
 conn = sqlite3.connect("fishing_log.db")
-cur = conn.cursor()
-cur.execute("ALTER TABLE fishing_log ADD COLUMN time TEXT;")
-cur.execute("ALTER TABLE fishing_log ADD COLUMN tide_height REAL;")
-conn.commit()
+report = migrate(conn)
 conn.close()
-print("✅ time と tide_height カラムを追加しました")
+if report["applied"]:
+    print(f"✅ v{report['from']} → v{report['to']}: {', '.join(report['applied'])}（{report['elapsed_ms']} ms）")
+else:
+    print(f"✅ スキーマは最新です（v{report['to']}）")
@@ -0,0 +1,120 @@
+# http_cache.py
+"""
+外部 API（Open-Meteo など）の JSON レスポンスのキャッシュ。
+
+キーは (URL, パラメータ) で、取得元ごとに TTL を決めて get_json を呼ぶ。
+中身は SQLite（CACHE_PATH）に置くので、アプリを再起動しても残る。
+MAX_ENTRIES を超えたら最後に使ったのが古いものから消す（LRU）。
+ヒット・ミスの回数は cache_stats() で見られる（プロセス内の累計）。
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import http_client
+from perf import timed
+
+CACHE_PATH = "http_cache.db"
+MAX_ENTRIES = 500
+
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+
+def _db() -> sqlite3.Connection:
+    """_lock を持った状態で呼ぶ"""
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key        TEXT PRIMARY KEY,
+                    body       TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_used  REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+        _conn = conn
+    return _conn
+
+
+def cache_key(url: str, params: dict) -> str:
+    """URL とパラメータ（順不同）→ キー"""
+    return url + "?" + json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _lookup(key: str, now: float) -> Optional[dict]:
+    with _lock:
+        conn = _db()
+        r = conn.execute("SELECT body, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if r is None:
+            _stats["misses"] += 1
+            return None
+        if r[1] <= now:
+            _stats["misses"] += 1
+            _stats["expired"] += 1
+            return None
+        with conn:
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        _stats["hits"] += 1
+    return json.loads(r[0])
+
+
+def _store(key: str, data: dict, ttl: float, now: float) -> None:
+    body = json.dumps(data, ensure_ascii=False)
+    with _lock:
+        conn = _db()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, fetched_at, expires_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, body, now, now + ttl, now),
+            )
+            over = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - MAX_ENTRIES
+            if over > 0:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                    (over,),
+                )
+                _stats["evictions"] += over
+
+
+@timed("http_cache.fetch", "api")
+def _fetch(url: str, params: dict, timeout: float) -> dict:
+    return http_client.get_json(url, params=params, timeout=timeout)
+
+
+def get_json(url: str, params: dict, *, ttl: float, timeout: float = 10) -> dict:
+    """
+    GET して JSON を返す。ttl 秒以内に同じ (url, params) を取っていればキャッシュから返す。
+    HTTP エラーはそのまま投げる（キャッシュには入れない）
+    """
+    key = cache_key(url, params)
+    now = time.time()
+    data = _lookup(key, now)
+    if data is not None:
+        return data
+
+    data = _fetch(url, params, timeout)
+    _store(key, data, ttl, time.time())
+    return data
+
+
+def cache_stats() -> dict:
+    with _lock:
+        entries = _db().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"entries": entries, "max_entries": MAX_ENTRIES, **_stats}
+
+
+def clear() -> None:
+    with _lock:
+        conn = _db()
+        with conn:
+            conn.execute("DELETE FROM responses")
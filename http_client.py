@@ -0,0 +1,177 @@
+# http_client.py
+"""
+外部 API（Open-Meteo・tide736 など）を呼ぶ共通の HTTP クライアント。
+
+- 1つの requests.Session を使い回し、ホストごとに keep-alive の接続をプールする
+- 429 / 5xx と接続エラーは、指数バックオフ＋ゆらぎ（jitter）をはさんで MAX_RETRIES 回まで再試行
+  （Retry-After ヘッダがあればそちらに従うが、待つのは RETRY_AFTER_MAX 秒まで）
+- get() の timeout は、空き待ち・再試行の待ちを含めた全体の秒数（期限を過ぎる再試行はしない）
+- ホストごとの同時リクエスト数を HOST_CONCURRENCY で制限（既定 DEFAULT_HOST_CONCURRENCY）
+- 新規接続・再利用の回数を connection_stats() と perf のカウンタ（http.connections.new / reused）に出す
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+from urllib3.util import Retry
+
+import perf
+
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5    # 0.5, 1, 2 秒 …
+BACKOFF_JITTER = 0.3    # 各待ち時間に 0〜0.3 秒を足す
+BACKOFF_MAX = 4.0       # バックオフ1回の待ちの上限（秒）
+RETRY_AFTER_MAX = 5.0   # Retry-After に従って待つ上限（秒）。長い指定でホストの枠を塞がない
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# ホスト → 同時に投げるリクエストの上限
+DEFAULT_HOST_CONCURRENCY = 4
+HOST_CONCURRENCY = {
+    "api.tide736.net": 2,
+}
+POOL_MAXSIZE = 8        # ホストごとに保持する接続数
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_host_sems: dict[str, threading.BoundedSemaphore] = {}
+_conn_seen: dict[str, tuple[int, int]] = {}    # ホスト → 最後に見た (接続数, リクエスト数)
+_conn_stats: dict[str, dict[str, int]] = {}    # ホスト → {"requests", "new", "reused"}
+
+
+def _retry_policy() -> Retry:
+    """再試行の回数・待ち時間の決め方（待つのと期限の確認は get() で行う）"""
+    return Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        backoff_jitter=BACKOFF_JITTER,
+        backoff_max=BACKOFF_MAX,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # 再試行しきったら最後のレスポンスを返す（raise_for_status は呼び出し側）
+    )
+
+
+def _new_session() -> requests.Session:
+    # urllib3 の中で待たせると timeout を超えて待つので、アダプタでは再試行しない
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+    s = requests.Session()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+def session() -> requests.Session:
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _new_session()
+        return _session
+
+
+def _host_sem(host: str) -> threading.BoundedSemaphore:
+    with _lock:
+        sem = _host_sems.get(host)
+        if sem is None:
+            sem = _host_sems[host] = threading.BoundedSemaphore(HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY))
+        return sem
+
+
+def _pool_totals(s: requests.Session, host: str) -> tuple[int, int]:
+    """host の接続プール（scheme・ポート・TLS 設定ごとに分かれる）の累計 (接続数, リクエスト数)"""
+    pools = s.get_adapter("https://" + host).poolmanager.pools
+    conns = reqs = 0
+    for key in pools.keys():
+        if key.key_host == host:
+            pool = pools.get(key)
+            if pool is not None:
+                conns += pool.num_connections
+                reqs += pool.num_requests
+    return conns, reqs
+
+
+def _account(s: requests.Session, host: str) -> None:
+    """
+    urllib3 の接続プールの累計（num_connections / num_requests）の増分を、新規接続・再利用として数える。
+    同時に走っている別リクエストの分もまとめて数えることがあるが、累計は合う
+    """
+    with _lock:
+        conns, reqs = _pool_totals(s, host)
+        prev_conns, prev_reqs = _conn_seen.get(host, (0, 0))
+        if conns < prev_conns or reqs < prev_reqs:  # プールが作り直された
+            prev_conns, prev_reqs = 0, 0
+        _conn_seen[host] = (conns, reqs)
+        new, total = conns - prev_conns, reqs - prev_reqs
+        c = _conn_stats.setdefault(host, {"requests": 0, "new": 0, "reused": 0})
+        c["requests"] += total
+        c["new"] += new
+        c["reused"] += max(total - new, 0)
+    perf.count("http.connections.new", new)
+    perf.count("http.connections.reused", max(total - new, 0))
+
+
+def _wait_before_retry(retry: Retry, r: Optional[requests.Response]) -> float:
+    """次の再試行までの秒数。Retry-After があればそれ（RETRY_AFTER_MAX まで）、無ければバックオフ"""
+    if r is not None:
+        after = retry.get_retry_after(r.raw)
+        if after:
+            return min(after, RETRY_AFTER_MAX)
+    return retry.get_backoff_time()
+
+
+def get(url: str, *, params: Optional[dict] = None, timeout: float = 10) -> requests.Response:
+    """
+    GET。timeout は同時リクエストの空き待ち・再試行の待ちを含めた全体の秒数で、
+    空きを待てなかった・最初の応答も得られないうちに過ぎたときは requests.Timeout などを投げる。
+    再試行しきっても（期限までに再試行できなくても）429 / 5xx のときはそのレスポンスを返す（raise_for_status は呼び出し側で）
+    """
+    s = session()
+    host = urlsplit(url).hostname or ""
+    deadline = time.monotonic() + timeout
+    sem = _host_sem(host)
+    if not sem.acquire(timeout=timeout):
+        raise requests.Timeout(f"{host} への同時リクエストの空きを {timeout:g} 秒待っても得られませんでした")
+    try:
+        retry = _retry_policy()
+        while True:
+            r: Optional[requests.Response] = None
+            try:
+                r = s.get(url, params=params, timeout=max(deadline - time.monotonic(), 0.01))
+                error = None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            finally:
+                _account(s, host)
+            if r is not None and not retry.is_retry("GET", r.status_code, "Retry-After" in r.headers):
+                return r
+            try:
+                retry = retry.increment("GET", url, response=r.raw if r is not None else None, error=error)
+            except MaxRetryError:
+                break
+            wait = _wait_before_retry(retry, r)
+            if time.monotonic() + wait >= deadline:
+                break
+            time.sleep(wait)
+    finally:
+        sem.release()
+    if r is not None:
+        return r
+    raise error
+
+
+def get_json(url: str, *, params: Optional[dict] = None, timeout: float = 10) -> dict:
+    r = get(url, params=params, timeout=timeout)
+    r.raise_for_status()
+    return r.json()
+
+
+def connection_stats() -> dict[str, dict[str, int]]:
+    """ホスト → {"requests": リクエスト数（再試行を含む）, "new": 新規接続数, "reused": 再利用した回数}"""
+    with _lock:
+        return {h: dict(v) for h, v in _conn_stats.items()}
@@ -0,0 +1,319 @@
+# image_store.py
+"""
+画像の保存先の切り替え口と、一覧・プレビュー用のサムネイル。
+
+    環境変数 FISHING_LOG_IMAGE_STORE、または secrets.toml の
+    [images]
+    store = "local"        # "cloudinary"（既定） / "local"
+    local_dir = "images"   # local のときの保存先
+
+レコードの image_url 列には、cloudinary なら公開 URL、local なら "local:<ファイル名>" が入る。
+サムネイルは
+  - Cloudinary：URL に変換パラメータ（c_limit,w_…,q_auto,f_auto）を入れるだけ（生成・保存は Cloudinary 側）
+  - local：保存時に Pillow で縮小・再圧縮した JPEG を thumbs/ に書き出す（古い画像は初回表示時に作る）
+元画像は、画面で「元の画像」を押したときだけ読み込む。
+
+アップロード前に、スマホの写真（5〜10 MB）を長辺 upload_max_px・品質 upload_quality の JPEG に縮小・再圧縮し、
+複数枚はスレッドプールで同時に送る（save_images）。
+
+画像の名前は元ファイルの SHA-256（Cloudinary は fishing_log/<hash>、local は <hash>.jpg）。
+送る前にローカルの索引（IMAGE_INDEX_PATH：保存先・ハッシュ → URL）を引き、同じ画像は二度と送らない。
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+import streamlit as st
+from PIL import Image, ImageOps
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from perf import timed
+
+logger = logging.getLogger(__name__)
+
+# 保存先の名前 → 説明
+STORES = {
+    "cloudinary": "Cloudinary",
+    "local": "ローカルのフォルダ",
+}
+DEFAULT_STORE = "cloudinary"
+DEFAULT_LOCAL_DIR = "images"
+
+# サムネイル：長辺の上限(px) と JPEG 品質
+THUMB_MAX_PX = 480
+THUMB_QUALITY = 70
+
+# アップロード前の縮小・再圧縮（[images] upload_max_px / upload_quality で変えられる）
+UPLOAD_MAX_PX = 2048
+UPLOAD_QUALITY = 85
+# 同時に送る枚数
+UPLOAD_WORKERS = 3
+
+LOCAL_PREFIX = "local:"
+THUMB_DIR = "thumbs"
+CLOUDINARY_FOLDER = "fishing_log"
+
+# 中身のハッシュ → 保存済み URL の索引
+IMAGE_INDEX_PATH = "image_index.db"
+
+# https://res.cloudinary.com/<cloud>/image/upload/<変換/>v123/fishing_log/xxx.jpg
+_CLOUDINARY_UPLOAD = re.compile(r"^(https?://res\.cloudinary\.com/[^/]+/image/upload/)(.+)$")
+
+_thumb_lock = threading.Lock()
+_index_lock = threading.Lock()
+_index_conn: Optional[sqlite3.Connection] = None
+
+
+def _setting(key: str) -> Optional[str]:
+    try:
+        return st.secrets.get("images", {}).get(key)
+    except Exception:
+        return None  # secrets.toml が無い（ローカル実行・ベンチなど）
+
+
+def store_name() -> str:
+    name = (os.environ.get("FISHING_LOG_IMAGE_STORE") or _setting("store") or DEFAULT_STORE).lower()
+    if name not in STORES:
+        raise ValueError(f"未知の画像の保存先です: {name}（{', '.join(STORES)} のどれか）")
+    return name
+
+
+def local_dir() -> str:
+    return os.environ.get("FISHING_LOG_IMAGE_DIR") or _setting("local_dir") or DEFAULT_LOCAL_DIR
+
+
+def upload_settings() -> tuple[int, int]:
+    """(長辺の上限 px, JPEG 品質)"""
+    return int(_setting("upload_max_px") or UPLOAD_MAX_PX), int(_setting("upload_quality") or UPLOAD_QUALITY)
+
+
+# ---- 縮小・再圧縮（UI に依存しない） ----
+def reencode_jpeg(data: bytes, max_px: int, quality: int) -> bytes:
+    """画像のバイト列 → 長辺 max_px 以下に縮小して再圧縮した JPEG。EXIF の向きは反映してから捨てる"""
+    with Image.open(io.BytesIO(data)) as im:
+        im = ImageOps.exif_transpose(im)
+        im.thumbnail((max_px, max_px), Image.LANCZOS)
+        if im.mode != "RGB":
+            im = im.convert("RGB")  # PNG の透過・パレットなど
+        out = io.BytesIO()
+        im.save(out, format="JPEG", quality=quality, optimize=True)
+        return out.getvalue()
+
+
+def make_thumbnail(data: bytes, max_px: int = THUMB_MAX_PX, quality: int = THUMB_QUALITY) -> bytes:
+    return reencode_jpeg(data, max_px, quality)
+
+
+def compress_for_upload(data: bytes, max_px: int, quality: int) -> Optional[bytes]:
+    """アップロード用に縮小・再圧縮した JPEG。小さくならない・Pillow で読めないときは None（元のまま送る）"""
+    try:
+        out = reencode_jpeg(data, max_px, quality)
+    except (OSError, Image.DecompressionBombError) as e:
+        logger.warning("画像を圧縮できなかったので元のまま送ります: %s", e)
+        return None
+    return out if len(out) < len(data) else None
+
+
+def cloudinary_thumbnail_url(url: str, max_px: int = THUMB_MAX_PX) -> str:
+    """Cloudinary の URL に縮小・自動品質・自動フォーマットの変換を入れる（Cloudinary 以外はそのまま）"""
+    m = _CLOUDINARY_UPLOAD.match(url)
+    if not m:
+        return url
+    return f"{m.group(1)}c_limit,w_{max_px},h_{max_px},q_auto,f_auto/{m.group(2)}"
+
+
+# ---- ローカル保存 ----
+def _local_paths(name: str) -> tuple[str, str]:
+    """"local:" の後ろのファイル名 → (元画像のパス, サムネイルのパス)"""
+    root = local_dir()
+    stem = os.path.splitext(name)[0]
+    return os.path.join(root, name), os.path.join(root, THUMB_DIR, stem + ".jpg")
+
+
+def _write_thumbnail(src: str, dst: str, data: Optional[bytes] = None) -> None:
+    if data is None:
+        with open(src, "rb") as f:
+            data = f.read()
+    thumb = make_thumbnail(data)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = dst + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(thumb)
+    os.replace(tmp, dst)
+
+
+@timed("image.local_save", "storage")
+def save_local(file, filename: str) -> str:
+    """元画像とサムネイルを local_dir() に書き出して "local:<ファイル名>" を返す"""
+    name = os.path.basename(filename)
+    data = file.getvalue() if hasattr(file, "getvalue") else file.read()
+    src, thumb = _local_paths(name)
+    os.makedirs(os.path.dirname(src) or ".", exist_ok=True)
+    with open(src, "wb") as f:
+        f.write(data)
+    _write_thumbnail(src, thumb, data)
+    return LOCAL_PREFIX + name
+
+
+# ---- ハッシュ → URL の索引 ----
+def _index() -> sqlite3.Connection:
+    """_index_lock を持った状態で呼ぶ"""
+    global _index_conn
+    if _index_conn is None:
+        conn = sqlite3.connect(IMAGE_INDEX_PATH, check_same_thread=False)
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS image_index (
+                    store      TEXT NOT NULL,
+                    sha256     TEXT NOT NULL,
+                    url        TEXT NOT NULL,
+                    bytes      INTEGER,
+                    created_at TEXT DEFAULT (datetime('now')),
+                    PRIMARY KEY (store, sha256)
+                )
+            """)
+        _index_conn = conn
+    return _index_conn
+
+
+def lookup(store: str, digest: str) -> Optional[str]:
+    """保存済みならその URL。local はファイルが消えていたら未保存扱い"""
+    with _index_lock:
+        r = _index().execute(
+            "SELECT url FROM image_index WHERE store = ? AND sha256 = ?", (store, digest)
+        ).fetchone()
+    if r is None:
+        return None
+    if r[0].startswith(LOCAL_PREFIX) and not os.path.exists(full_url(r[0])):
+        return None
+    return r[0]
+
+
+def remember(store: str, digest: str, url: str, nbytes: int) -> None:
+    with _index_lock, _index():
+        _index().execute(
+            "INSERT OR REPLACE INTO image_index (store, sha256, url, bytes) VALUES (?, ?, ?, ?)",
+            (store, digest, url, nbytes),
+        )
+
+
+# ---- アプリから使う入口 ----
+class UploadResult(NamedTuple):
+    filename: str          # 元のファイル名（報告用）
+    url: str               # image_url 列に入れる値
+    original_bytes: int
+    sent_bytes: int        # 保存済みで送らなかったときは 0
+    elapsed_ms: float      # 圧縮＋アップロード
+    reused: bool = False   # 索引に同じ画像があった
+
+
+def _save_one(data: bytes, digest: str, filename: str, store: str,
+              max_px: int, quality: int) -> UploadResult:
+    t0 = time.perf_counter()
+    url = lookup(store, digest)
+    if url is not None:
+        logger.info("保存済みの画像なので送りません: %s (%s)", filename, digest[:12])
+        return UploadResult(filename, url, len(data), 0, round((time.perf_counter() - t0) * 1000, 1), True)
+
+    small = compress_for_upload(data, max_px, quality)
+    body = data if small is None else small
+    if store == "local":
+        ext = ".jpg" if small is not None else (os.path.splitext(filename)[1].lower() or ".jpg")
+        url = save_local(io.BytesIO(body), digest + ext)
+    else:
+        from db_utils_gsheets import upload_to_cloudinary
+        url = upload_to_cloudinary(io.BytesIO(body), f"{CLOUDINARY_FOLDER}/{digest}")
+    remember(store, digest, url, len(body))
+
+    res = UploadResult(filename, url, len(data), len(body), round((time.perf_counter() - t0) * 1000, 1))
+    logger.info("画像を保存しました: %s %d → %d bytes (%.0f ms)", filename, len(data), len(body), res.elapsed_ms)
+    return res
+
+
+def save_images(items: list[Optional[tuple[object, str]]],
+                store: Optional[str] = None) -> list[Optional[UploadResult]]:
+    """
+    (file_uploader の file, ファイル名) のリスト（None の枠は飛ばす）を、縮小・再圧縮してから
+    同時に保存する。戻り値は items と同じ並び。どれかが失敗したら、残りを待ってから例外を投げ直す。
+    名前は中身のハッシュで付けるので、同じ画像は（同じ呼び出しの中でも）1回しか送らない。
+    store を省略したら設定の保存先。
+    """
+    jobs = []
+    for i, it in enumerate(items):
+        if it is not None:
+            data = it[0].getvalue() if hasattr(it[0], "getvalue") else it[0].read()
+            jobs.append((i, data, hashlib.sha256(data).hexdigest(), it[1]))
+    out: list[Optional[UploadResult]] = [None] * len(items)
+    if not jobs:
+        return out
+
+    store = store or store_name()
+    max_px, quality = upload_settings()
+    firsts: dict[str, int] = {}  # ハッシュ → 最初に出てきた枠
+    # ワーカーにも Streamlit のコンテキストを渡す（st.secrets・st.cache_resource を使うため）
+    with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(jobs)),
+                            initializer=add_script_run_ctx, initargs=(None, get_script_run_ctx(suppress_warning=True))) as pool:
+        futures = {}
+        for i, data, digest, name in jobs:
+            if digest not in futures:
+                firsts[digest] = i
+                futures[digest] = pool.submit(_save_one, data, digest, name, store, max_px, quality)
+    for i, data, digest, name in jobs:
+        r = futures[digest].result()
+        out[i] = r if firsts[digest] == i else UploadResult(name, r.url, len(data), 0, 0.0, True)
+    return out
+
+
+def save_image(file, filename: str) -> str:
+    """file_uploader の file を設定の保存先に保存して、image_url 列に入れる値を返す"""
+    return save_images([(file, filename)])[0].url
+
+
+def upload_report(results: list[Optional[UploadResult]]) -> list[str]:
+    """画面に出す1枚1行の報告"""
+    lines = []
+    for slot, r in enumerate(results, start=1):
+        if r is None:
+            continue
+        if r.reused:
+            lines.append(f"画像{slot}: 同じ画像が保存済みなので送りませんでした（{_fmt_bytes(r.original_bytes)}）")
+            continue
+        saved = r.original_bytes - r.sent_bytes
+        pct = saved / r.original_bytes * 100 if r.original_bytes else 0.0
+        lines.append(f"画像{slot}: {_fmt_bytes(r.original_bytes)} → {_fmt_bytes(r.sent_bytes)}"
+                     f"（-{pct:.0f}%）{r.elapsed_ms / 1000:.1f} 秒")
+    return lines
+
+
+def _fmt_bytes(n: int) -> str:
+    if n >= 1024 * 1024:
+        return f"{n / 1024 / 1024:.1f} MB"
+    return f"{n / 1024:.0f} KB" if n >= 1024 else f"{n} B"
+
+
+def thumbnail_url(url: str) -> str:
+    """一覧・プレビュー用。st.image に渡せる URL かパスを返す"""
+    if url.startswith(LOCAL_PREFIX):
+        src, thumb = _local_paths(url[len(LOCAL_PREFIX):])
+        if not os.path.exists(thumb) and os.path.exists(src):
+            with _thumb_lock:
+                if not os.path.exists(thumb):
+                    _write_thumbnail(src, thumb)
+        return thumb if os.path.exists(thumb) else src
+    return cloudinary_thumbnail_url(url)
+
+
+def full_url(url: str) -> str:
+    """元画像。st.image に渡せる URL かパスを返す"""
+    if url.startswith(LOCAL_PREFIX):
+        return _local_paths(url[len(LOCAL_PREFIX):])[0]
+    return url
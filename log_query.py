@@ -0,0 +1,45 @@
+# log_query.py
+"""
+編集タブのレコード検索の SQL 部品。SQLite バックエンド（fishing_log）とシートのミラー（sheet_rows）で共通。
+date / area / lure はどちらのテーブルにもインデックスがあるので、そこから絞り込まれる。
+"""
+from __future__ import annotations
+
+from datetime import date as Date
+from typing import Optional
+
+# 検索の並び順（編集タブの一覧と同じ：日付 desc、時間 asc）
+ORDER_BY = 'ORDER BY "date" DESC, "time" ASC, CAST("id" AS INTEGER) DESC'
+
+# キーワードを探す列
+TEXT_COLUMNS = ["area", "lure", "action", "bait_pattern", "wind_direction", "tide_type"]
+
+
+def where_clause(*,
+                 date_from: Optional[Date | str] = None,
+                 date_to: Optional[Date | str] = None,
+                 area: Optional[str] = None,
+                 lure: Optional[str] = None,
+                 caught_only: bool = False,
+                 keyword: Optional[str] = None) -> tuple[str, list]:
+    """検索条件 → ("WHERE ...", パラメータ)。条件なしなら ("", [])"""
+    conds, params = [], []
+    if date_from:
+        conds.append('"date" >= ?')
+        params.append(str(date_from))
+    if date_to:
+        conds.append('"date" <= ?')
+        params.append(str(date_to))
+    if area:
+        conds.append('"area" = ?')
+        params.append(area)
+    if lure:
+        conds.append('"lure" = ?')
+        params.append(lure)
+    if caught_only:
+        conds.append('CAST("size" AS REAL) > 0')
+    if keyword and keyword.strip():
+        like = f"%{keyword.strip()}%"
+        conds.append("(" + " OR ".join(f'"{c}" LIKE ?' for c in TEXT_COLUMNS) + ")")
+        params.extend([like] * len(TEXT_COLUMNS))
+    return ("WHERE " + " AND ".join(conds)) if conds else "", params
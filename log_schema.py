@@ -0,0 +1,87 @@
+# log_schema.py
+# 釣行ログの列定義と、生の値 → DataFrame の変換（どのストレージバックエンドでも共通）
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# 列定義（ヘッダ順を固定）
+COLUMNS = ["id","date","time","area","tide_type","tide_height","temperature",
+           "wind_direction","lure","action","size","image_url1","image_url2","image_url3","bait_pattern"]
+
+# to_df が追加する派生列（date / time を一度だけパースしたもの）
+DERIVED_COLUMNS = ["date_dt", "time_dt"]
+NUMERIC_COLUMNS = ["tide_height", "temperature", "size"]
+
+# 未入力時の既定値（どのバックエンドでも同じ）
+DEFAULT_TIME = "00:00"
+DEFAULT_BAIT = "その他/不明"
+
+def empty_df() -> pd.DataFrame:
+    return pd.DataFrame(columns=COLUMNS + DERIVED_COLUMNS)
+
+def _value_matrix(rows: list[list[str]]) -> np.ndarray:
+    """
+    生の値 → (行数, len(COLUMNS)) の object 行列。
+    行の列数が少ない → 足りない分は ""、多い場合（将来レイアウトを変えたとき用）は切り捨て。
+    行の長さの種類ごとにまとめて詰めるので、1行ずつのコピーは発生しない。
+    """
+    n, width = len(rows), len(COLUMNS)
+    lens = np.fromiter(map(len, rows), dtype=np.int64, count=n)
+    if (lens == width).all():
+        return np.array(rows, dtype=object).reshape(n, width)
+    mat = np.full((n, width), "", dtype=object)
+    for length in np.unique(lens):
+        if length == 0:
+            continue
+        idx = np.flatnonzero(lens == length)
+        w = min(int(length), width)
+        block = np.array([rows[i] for i in idx], dtype=object).reshape(len(idx), int(length))
+        mat[idx, :w] = block[:, :w]
+    return mat
+
+def _id_column(values: np.ndarray) -> pd.Series:
+    try:
+        # ふつうは全行が整数文字列なので一括変換できる
+        return pd.Series(values.astype(np.int64), dtype="Int64")
+    except (ValueError, TypeError):
+        return pd.Series(pd.to_numeric(values, errors="coerce")).astype("Int64")
+
+def _numeric_unique(values: np.ndarray) -> np.ndarray:
+    """潮位・気温・サイズは同じ値が多いので、ユニーク値だけ数値化して展開する"""
+    codes, uniq = pd.factorize(values)
+    parsed = pd.to_numeric(uniq, errors="coerce").astype(float)
+    return np.where(codes >= 0, np.asarray(parsed)[codes], np.nan)
+
+def _datetime_unique(values: np.ndarray, **kwargs) -> np.ndarray:
+    """日付・時刻も同様に、ユニーク値だけパースして展開する"""
+    codes, uniq = pd.factorize(values)
+    parsed = pd.to_datetime(pd.Series(uniq, dtype=object), errors="coerce", **kwargs)
+    out = parsed.to_numpy(dtype="datetime64[ns]")[codes]
+    out[codes < 0] = np.datetime64("NaT")
+    return out
+
+def month_labels(dates: pd.Series) -> np.ndarray:
+    """date_dt → "YYYY-MM"（NaT は None）。strftime は1行ずつで遅いので、月の種類ごとに文字列化する"""
+    months = dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[M]")
+    codes, uniq = pd.factorize(months)
+    labels = np.datetime_as_string(np.asarray(uniq, dtype="datetime64[M]"), unit="M").astype(object)
+    return np.where(codes >= 0, labels[codes] if len(labels) else None, None)
+
+def to_df(rows: list[list[str]]) -> pd.DataFrame:
+    """
+    生の値（列順は COLUMNS、値は文字列。欠損は "" か None）の2次元リスト → DataFrame。
+    値を一度 object 行列にしてから列ごとに型付きの配列を作る。
+    date / time もここで一度だけパースして date_dt / time_dt に入れておく。
+    """
+    if not rows:
+        return empty_df()
+
+    mat = _value_matrix(rows)
+    data = {name: pd.Series(mat[:, i], dtype=object) for i, name in enumerate(COLUMNS)}
+    data["id"] = _id_column(mat[:, 0])
+    for col in NUMERIC_COLUMNS:
+        data[col] = pd.Series(_numeric_unique(mat[:, COLUMNS.index(col)]))
+    data["date_dt"] = pd.Series(_datetime_unique(mat[:, 1]))
+    data["time_dt"] = pd.Series(_datetime_unique(mat[:, 2], format="%H:%M"))
+    return pd.DataFrame(data, copy=False)
@@ -0,0 +1,155 @@
+# log_snapshot.py
+"""
+読み込んだ釣行ログを Arrow IPC ファイル（列指向・型付き）として保存しておき、
+プロセス起動直後はそれをメモリマップで即座に読み込む（最新の読み込みは裏で行う）。
+pyarrow が無い環境ではスナップショットを使わず、普通に読み込むだけになる。
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+import pandas as pd
+
+import data_cache
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # pragma: no cover - 任意依存
+    pa = None
+    pa_ipc = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = ".snapshots"
+
+# 値の種類が少ない列はファイル上で辞書エンコードする
+DICTIONARY_COLUMNS = ["date", "time", "area", "tide_type", "wind_direction", "lure", "action", "bait_pattern"]
+
+_VERSION_KEY = b"data_version"
+_lock = threading.Lock()
+_refreshing: set[str] = set()
+_last_load: Optional[dict] = None
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _path(key: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{key}.arrow")
+
+
+def save_snapshot(key: str, df: pd.DataFrame, version: int) -> None:
+    """df を data_version 付きで保存する（書き込み途中のファイルを読まないよう置き換えで保存）"""
+    if not available():
+        return
+    d = df.copy()
+    for c in DICTIONARY_COLUMNS:
+        if c in d.columns:
+            d[c] = d[c].astype("category")
+    table = pa.Table.from_pandas(d, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _VERSION_KEY: str(version).encode()})
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = _path(key)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        # 圧縮しない（読み込み時にメモリマップしたまま使えるように）
+        with pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def load_snapshot(key: str) -> Optional[tuple[pd.DataFrame, int]]:
+    """(DataFrame, 保存時の data_version)。無い・壊れている場合は None"""
+    global _last_load
+    path = _path(key)
+    if not available() or not os.path.exists(path):
+        return None
+    t0 = time.perf_counter()
+    try:
+        with pa.memory_map(path, "r") as source:
+            table = pa_ipc.open_file(source).read_all()
+        version = int((table.schema.metadata or {}).get(_VERSION_KEY, b"0"))
+        df = table.to_pandas()
+    except Exception as e:
+        logger.warning("snapshot %s を読めませんでした: %s", path, e)
+        return None
+
+    # 利用側は文字列列に fillna などをするので、カテゴリ型は元の object に戻す
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(df[c].dtype):
+            df[c] = df[c].astype(object)
+    if "id" in df.columns:
+        df["id"] = df["id"].astype("Int64")
+
+    elapsed_ms = round((time.perf_counter() - t0) * 1000, 2)
+    _last_load = {"key": key, "version": version, "rows": len(df), "elapsed_ms": elapsed_ms}
+    logger.info("snapshot %s v%s (%d rows) loaded in %.2f ms", key, version, len(df), elapsed_ms)
+    return df, version
+
+
+def last_load_report() -> Optional[dict]:
+    """直近のスナップショット読み込み（key, version, rows, elapsed_ms）"""
+    return _last_load
+
+
+def _save_in_background(key: str, df: pd.DataFrame, version: int) -> None:
+    def _run():
+        try:
+            save_snapshot(key, df, version)
+        except Exception as e:
+            logger.warning("snapshot %s を保存できませんでした: %s", key, e)
+    threading.Thread(target=_run, daemon=True).start()
+
+
+def _refresh_in_background(key: str, loader: Callable[[], pd.DataFrame], snap: pd.DataFrame) -> None:
+    """スナップショットを返したあとで最新を読み込み、違っていればバージョンを進めて差し替える"""
+    with _lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def _run():
+        try:
+            fresh = loader()
+            if not fresh.reset_index(drop=True).equals(snap.reset_index(drop=True)):
+                v = data_cache.bump_version()
+                data_cache.put(key, fresh, v)
+                save_snapshot(key, fresh, v)
+        except Exception as e:
+            logger.warning("snapshot %s の更新に失敗しました: %s", key, e)
+        finally:
+            with _lock:
+                _refreshing.discard(key)
+    threading.Thread(target=_run, daemon=True).start()
+
+
+def cached_frame(key: str, loader: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """
+    data_cache.get_or_load にスナップショットを組み合わせたもの。
+    - このプロセスでまだ一度も読んでいない → スナップショットがあれば即返し、裏で最新を読み込む
+    - それ以外 → 通常どおり data_version ごとにキャッシュし、読み込み直したらスナップショットも更新
+    返り値は共有オブジェクトなので、書き換える場合はコピーすること。
+    """
+    if data_cache.peek(key) is None:
+        snap = load_snapshot(key)
+        if snap is not None:
+            df, version = snap
+            v = data_cache.restore_version(version)
+            data_cache.put(key, df, v)
+            _refresh_in_background(key, loader, df)
+            return df
+
+    def _load_and_save() -> pd.DataFrame:
+        version = data_cache.data_version()
+        df = loader()
+        _save_in_background(key, df, version)
+        return df
+
+    return data_cache.get_or_load(key, _load_and_save)
@@ -0,0 +1,186 @@
+# perf.py
+"""
+再実行（rerun）ごとの処理時間と外部 API の呼び出し回数を記録する。
+
+    環境変数 FISHING_LOG_PERF=1、または secrets.toml の
+    [debug]
+    perf = true
+
+有効なときは、画面下の「⏱ パフォーマンス」パネルに内訳を出し、PERF_LOG_PATH に1 rerun = 1行の JSON を追記する。
+無効なときの @timed は「フラグを見て元の関数を呼ぶだけ」なので、ほぼコストはかからない。
+"""
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional, TypeVar
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+PERF_LOG_PATH = "perf_log.jsonl"
+
+# 種類：api = 外部サービス（Sheets 以外の HTTP・アップロード）、storage = ストレージバックエンド、render = 画面の描画
+KINDS = ("api", "storage", "render")
+
+F = TypeVar("F", bound=Callable)
+
+_enabled: Optional[bool] = None
+_local = threading.local()  # Streamlit はセッションごとに別スレッドでスクリプトを実行する
+_file_lock = threading.Lock()
+_counter_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    global _enabled
+    if _enabled is None:
+        flag = os.environ.get("FISHING_LOG_PERF")
+        if flag is None:
+            try:
+                flag = st.secrets.get("debug", {}).get("perf", False)
+            except Exception:
+                flag = False  # secrets.toml が無い（ローカル実行・ベンチなど）
+        _enabled = str(flag).lower() in ("1", "true", "yes", "on")
+    return _enabled
+
+
+def set_enabled(flag: bool) -> None:
+    """設定を読み直さずに切り替える（ベンチ・手元の確認用）"""
+    global _enabled
+    _enabled = bool(flag)
+
+
+def begin_rerun() -> None:
+    """スクリプトの先頭で呼ぶ。このスレッドの記録をリセットする"""
+    if not enabled():
+        return
+    _local.started = time.perf_counter()
+    _local.events = []
+    _local.counters = {}
+
+
+def _record(name: str, kind: str, ms: float, ok: bool) -> None:
+    events = getattr(_local, "events", None)
+    if events is not None:  # begin_rerun の外（裏スレッドなど）は記録しない
+        events.append({"name": name, "kind": kind, "ms": round(ms, 2), "ok": ok})
+
+
+def count(name: str, n: int = 1) -> None:
+    """この rerun の回数カウンタを n 増やす（HTTP の新規接続・再利用など、時間ではなく回数で見たいもの）"""
+    counters = getattr(_local, "counters", None)
+    if counters is not None and n:
+        with _counter_lock:  # ワーカースレッドと共有していることがある
+            counters[name] = counters.get(name, 0) + n
+
+
+def timed(name: str, kind: str = "render") -> Callable[[F], F]:
+    """関数の処理時間を記録するデコレータ。例外も ok=False で記録してそのまま投げ直す"""
+    def deco(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            ok = False
+            try:
+                out = fn(*args, **kwargs)
+                ok = True
+                return out
+            finally:
+                _record(name, kind, (time.perf_counter() - t0) * 1000, ok)
+        return wrapper  # type: ignore[return-value]
+    # デコレートされる時点（import 時）に設定を読んでおく
+    enabled()
+    return deco
+
+
+def worker_init() -> Callable[[], None]:
+    """
+    スレッドプールの initializer 用。呼んだ時点の rerun の記録先をワーカースレッドにも共有させ、
+    ワーカーで呼ばれた @timed もこの rerun に記録する（list.append はスレッドをまたいでも安全）
+    """
+    events = getattr(_local, "events", None)
+    started = getattr(_local, "started", None)
+    counters = getattr(_local, "counters", None)
+
+    def init() -> None:
+        _local.events = events
+        _local.started = started
+        _local.counters = counters
+    return init
+
+
+def rerun_report() -> Optional[dict]:
+    """このスレッドの現在の rerun の集計。begin_rerun していなければ None"""
+    events = getattr(_local, "events", None)
+    if events is None:
+        return None
+    by_name: dict[str, dict] = {}
+    for e in events:
+        s = by_name.setdefault(e["name"], {"name": e["name"], "kind": e["kind"], "calls": 0,
+                                           "total_ms": 0.0, "max_ms": 0.0, "errors": 0})
+        s["calls"] += 1
+        s["total_ms"] = round(s["total_ms"] + e["ms"], 2)
+        s["max_ms"] = max(s["max_ms"], e["ms"])
+        s["errors"] += 0 if e["ok"] else 1
+    return {
+        "ts": datetime.now().isoformat(timespec="milliseconds"),
+        "total_ms": round((time.perf_counter() - _local.started) * 1000, 2),
+        "api_calls": sum(1 for e in events if e["kind"] == "api"),
+        "storage_calls": sum(1 for e in events if e["kind"] == "storage"),
+        "counters": dict(sorted((getattr(_local, "counters", None) or {}).items())),
+        "summary": sorted(by_name.values(), key=lambda s: -s["total_ms"]),
+        "events": events,
+    }
+
+
+def _write_log(report: dict) -> None:
+    try:
+        line = json.dumps(report, ensure_ascii=False)
+        with _file_lock, open(PERF_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        logger.warning("perf log を書けませんでした: %s", e)
+
+
+def _fmt_stats(d: dict) -> str:
+    return " / ".join(f"{k}（{_fmt_stats(v)}）" if isinstance(v, dict) else f"{k}: {v}" for k, v in d.items())
+
+
+def end_rerun(stats: Optional[dict[str, Callable[[], Optional[dict]]]] = None) -> None:
+    """
+    スクリプトの末尾で呼ぶ。ログに1行書き、折りたたみのデバッグパネルを出す。
+    stats は 表示名 → プロセス全体の統計を返す関数（キャッシュのヒット数など。無効なときは呼ばない）。
+    パネルに1行ずつ出し、ログにも入れる（None を返したものは出さない）
+    """
+    if not enabled():
+        return
+    report = rerun_report()
+    if report is None:
+        return
+    _local.events = None
+    _local.counters = None
+    report["stats"] = {name: v for name, fn in (stats or {}).items() if (v := fn()) is not None}
+    _write_log(report)
+
+    with st.expander(f"⏱ パフォーマンス（この表示 {report['total_ms']:.0f} ms / "
+                     f"API {report['api_calls']} 回 / ストレージ {report['storage_calls']} 回）"):
+        if report["summary"]:
+            st.dataframe(
+                [{k: s[k] for k in ("name", "kind", "calls", "total_ms", "max_ms", "errors")}
+                 for s in report["summary"]],
+                use_container_width=True,
+            )
+        else:
+            st.caption("記録された処理はありません。")
+        if report["counters"]:
+            st.caption(" / ".join(f"{k}: {v}" for k, v in report["counters"].items()))
+        for name, v in report["stats"].items():
+            st.caption(f"{name}：{_fmt_stats(v)}")
+        st.caption(f"詳細は {PERF_LOG_PATH} に JSON Lines で追記しています。")
@@ -0,0 +1,76 @@
+# tests/test_analysis_cube.py
+"""analysis_cube：書き込みとキューブの作り直しが重なっても、同じ変更を二重に数えない"""
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+import analysis_cube
+import data_cache
+import db_utils
+import log_snapshot
+
+
+@pytest.fixture
+def sqlite_log(tmp_path, monkeypatch):
+    """空の SQLite バックエンドと、冷えたキューブ・キャッシュ"""
+    monkeypatch.setenv("FISHING_LOG_BACKEND", "sqlite")
+    monkeypatch.setattr(db_utils, "DB_PATH", str(tmp_path / "fishing_log.db"))
+    monkeypatch.setattr(db_utils, "_conn", None)
+    monkeypatch.setattr(log_snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(data_cache, "_entries", {})
+    monkeypatch.setattr(analysis_cube, "_cells", {})
+    monkeypatch.setattr(analysis_cube, "_version", None)
+    monkeypatch.setattr(analysis_cube, "_frame", None)
+    yield
+    if db_utils._conn is not None:
+        db_utils._conn.close()
+
+
+def _record(size: float | None) -> dict:
+    return dict(
+        date="2024-05-01", time="06:00", area="芝浦", tide_type="大潮",
+        tide_height=120.0, temperature=18.5, wind_direction="北", lure="ミノー",
+        action="ただ巻き", size=size,
+    )
+
+
+def test_insert_during_rebuild_is_counted_once(sqlite_log, monkeypatch):
+    db_utils.insert_rows([_record(40.0)])
+
+    real_bump = db_utils.bump_version
+    rebuild = threading.Thread(target=analysis_cube.get_cube)
+
+    def bump_after_rebuild(changes=None):
+        # コミットの直後・変更通知の直前に、冷えたキューブの作り直しを走らせる。
+        # 書き込み側がロックを持ったまま通知していれば、作り直しは読み出しで待たされる
+        rebuild.start()
+        rebuild.join(timeout=0.5)
+        return real_bump(changes)
+
+    monkeypatch.setattr(db_utils, "bump_version", bump_after_rebuild)
+    db_utils.insert_rows([_record(30.0)])
+    rebuild.join()
+    monkeypatch.setattr(db_utils, "bump_version", real_bump)
+
+    cube, version = analysis_cube.get_cube()
+    assert version == data_cache.data_version()
+    assert cube["trips"].sum() == 2
+    assert cube["catches"].sum() == 2
+    assert cube["size_sum"].sum() == pytest.approx(70.0)
+
+
+def test_incremental_updates_match_rebuild(sqlite_log):
+    ids = [r["id"] for r in db_utils.insert_rows([_record(40.0), _record(None), _record(25.0)])]
+    analysis_cube.get_cube()
+
+    rec = {k: v for k, v in _record(None).items() if k != "date"}
+    db_utils.update_rows([dict(rec, row_id=ids[0])])
+    db_utils.delete_rows([ids[2]])
+    incremental = analysis_cube.get_cube().frame
+
+    analysis_cube._version = None  # 全件から作り直した結果と比べる
+    rebuilt = analysis_cube.get_cube().frame
+    assert incremental["trips"].sum() == rebuilt["trips"].sum() == 2
+    assert incremental["catches"].sum() == rebuilt["catches"].sum() == 0
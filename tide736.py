@@ -0,0 +1,126 @@
+# tide736.py
+# tide736.net（潮位 API）まわり。UI を起動せずに import できるよう fishing_log_app から分けたもの
+from __future__ import annotations
+
+from datetime import datetime, date as Date
+from typing import Optional
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+
+import tide_store
+
+TIDE736_PORTS = {
+    "芝浦": {"pc": 13, "hc": 2},
+    "羽田": {"pc": 13, "hc": 3},
+    "銚子": {"pc": 12, "hc": 2},
+    "鴨川": {"pc": 12, "hc": 6},
+    "岩井袋": {"pc": 12, "hc": 10},
+    "横須賀": {"pc": 14, "hc": 7},
+    "江の島": {"pc": 14, "hc": 19},
+    "気仙沼": {"pc": 4, "hc": 1},
+    "石巻": {"pc": 4, "hc": 6},
+}
+
+def fetch_tide736_day(pc: int, hc: int, target_date: Date) -> list[dict]:
+    """1日分の潮位リスト（tide736 の chart.tide と同じ形）。取得・保存は tide_store（月ごとにまとめて取る）"""
+    d = tide_store.get_day(pc, hc, target_date)
+    return [{"time": f"{m // 60:02d}:{m % 60:02d}", "cm": round(c, 1)}  # float32 → tide736 と同じ 0.1cm 単位
+            for m, c in zip(d.minutes.tolist(), d.cm.tolist())]
+
+def get_tide_height_for_time(pc: int, hc: int, target_date: Date, t: datetime.time):
+    """t の潮位(cm)（前後の点から線形補間）と、その時刻 "HH:MM" """
+    cm = interpolate_tide(tide_store.get_day(pc, hc, target_date), t.hour * 60 + t.minute)
+    if np.isnan(cm):
+        raise ValueError("tide data not found")
+    return round(float(cm), 1), t.strftime("%H:%M")
+
+def interpolate_tide(day: tide_store.TideDay, minutes):
+    """1日分の系列から minutes（0時からの分。スカラーでも配列でも）の潮位を二分探索＋線形補間で。範囲外は NaN"""
+    return np.interp(minutes, day.minutes, day.cm, left=np.nan, right=np.nan)
+
+# 複数日の系列を1本につなげるときの日ごとのずらし幅（1日の分 0〜1440 より大きければよい）
+_DAY_STRIDE = 2048
+
+def interp_days(days: list[Optional[tide_store.TideDay]], day_idx: np.ndarray, minutes: np.ndarray) -> np.ndarray:
+    """
+    i 行目 → days[day_idx[i]] の minutes[i] 分の潮位（線形補間）。
+    日ごとに分をずらして1本の配列につなげ、np.interp（二分探索）1回で全行を引く。
+    その日のデータが無い（None）・時刻が無効（NaN）・その日の範囲外の行は NaN
+    """
+    day_idx = np.asarray(day_idx, dtype=np.int64)
+    minutes = np.asarray(minutes, dtype=float)
+    out = np.full(len(minutes), np.nan)
+    have = [(i, d) for i, d in enumerate(days) if d is not None and len(d.minutes)]
+    if not have or not len(minutes):
+        return out
+
+    x = np.concatenate([d.minutes.astype(np.int64) + i * _DAY_STRIDE for i, d in have])
+    y = np.concatenate([d.cm for _, d in have]).astype(float)
+    first = np.full(len(days), np.inf)
+    last = np.full(len(days), -np.inf)
+    for i, d in have:
+        first[i], last[i] = d.minutes[0], d.minutes[-1]
+
+    ok = (minutes >= first[day_idx]) & (minutes <= last[day_idx])  # NaN の時刻もここで落ちる
+    out[ok] = np.interp(day_idx[ok] * _DAY_STRIDE + minutes[ok], x, y)
+    return out
+
+def tide_heights(pc, hc, dates, times) -> np.ndarray:
+    """
+    (pc, hc, 日付, 時刻) の組ごとの潮位(cm)をまとめて引く（過去の記録の tide_height の埋め戻し用）。
+    dates は "YYYY-MM-DD" か date、times は "HH:MM" か time。系列は港ごとに tide_store.get_days で
+    一度に読み（無い月だけ取りに行く）、補間は interp_days で全行まとめて行う。引けない行は NaN
+    """
+    n = len(dates)
+    day = pd.to_datetime(pd.Series(dates, dtype=object).astype(str).str[:10], format="%Y-%m-%d", errors="coerce")
+    tm = pd.to_datetime(pd.Series(times, dtype=object).astype(str).str[:5], format="%H:%M", errors="coerce")
+    minutes = (tm.dt.hour * 60 + tm.dt.minute).to_numpy(dtype=float, na_value=np.nan)
+
+    keys = pd.DataFrame({
+        "pc": np.broadcast_to(np.asarray(pc), n),
+        "hc": np.broadcast_to(np.asarray(hc), n),
+        "date": np.datetime_as_string(day.to_numpy(dtype="datetime64[D]"), unit="D"),
+    })
+    valid = day.notna().to_numpy()
+    codes, uniques = pd.MultiIndex.from_frame(keys[valid]).factorize()
+
+    days: list[Optional[tide_store.TideDay]] = [None] * len(uniques)
+    by_port: dict[tuple[int, int], list[int]] = {}
+    for i, (p, h, _) in enumerate(uniques):
+        by_port.setdefault((int(p), int(h)), []).append(i)
+    for (p, h), idx in by_port.items():
+        found = tide_store.get_days(p, h, [uniques[i][2] for i in idx])
+        for i in idx:
+            days[i] = found.get(uniques[i][2])
+
+    out = np.full(n, np.nan)
+    out[valid] = interp_days(days, codes, minutes[valid])
+    return out
+
+def build_tide736_image_url(
+    target_date: Date,
+    pc: int,
+    hc: int,
+    width: int = 768,
+    height: int = 320,
+) -> str:
+    base = "https://api.tide736.net/tide_image.php"
+    params = {
+        "pc": pc,
+        "hc": hc,
+        "yr": target_date.year,
+        "mn": target_date.month,
+        "dy": target_date.day,
+        "rg": "day",
+        "w": width,
+        "h": height,
+        "lc": "blue",
+        "gcs": "cyan",
+        "gcf": "blue",
+        "ld": "on",
+        "ttd": "on",
+        "tsmd": "on",
+    }
+    return base + "?" + urllib.parse.urlencode(params)
@@ -0,0 +1,101 @@
+# tide_heatmap.py
+"""
+潮位 × 時間帯ヒートマップの集計エンジン。
+行ごとの潮位(cm)・時刻(時)・サイズを整数のビン番号にして np.bincount で一度に数える。
+ラベル文字列を作るのは最後の軸だけなので、数十万件でも刻みを変えるたびに計算し直せる。
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from log_schema import DEFAULT_TIME
+
+# 東京湾向けの既定値（UIで変えられる）
+DEFAULT_TIDE_MAX_CM = 220.0   # 上限（これ以上は最後のビンにまとめる）
+DEFAULT_TIDE_STEP_CM = 20.0   # 刻み
+DEFAULT_HOUR_STEP = 2
+
+# 指標 → 色の凡例
+METRICS = {
+    "count": "釣果数",
+    "mean": "平均サイズ (cm)",
+    "max": "最大サイズ (cm)",
+    "catch_rate": "キャッチ率（%）",
+}
+
+
+def tide_cm(tide_height: pd.Series) -> np.ndarray:
+    """潮位 → cm（欠損は NaN）。“m”入力の可能性をcmに正規化（0.1〜5 をmとみなす）"""
+    h = pd.to_numeric(tide_height, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return np.where((h >= 0.1) & (h <= 5), h * 100, h)
+
+
+def hours(time: pd.Series, time_dt: pd.Series) -> np.ndarray:
+    """時刻 → 時（0〜23）。00:00 は“空欄代替”として扱って -1（パースできない時刻も -1）"""
+    h = time_dt.dt.hour.to_numpy(dtype=float, na_value=np.nan)
+    invalid = (time == DEFAULT_TIME).to_numpy() | np.isnan(h)
+    return np.where(invalid, -1, h).astype(np.int64)
+
+
+def _fmt(x: float) -> str:
+    return f"{x:g}"
+
+
+def tide_labels(tide_step: float, tide_max: float) -> list[str]:
+    edges = np.append(np.arange(0.0, tide_max, tide_step), tide_max)
+    return [f"{_fmt(edges[i])}–{_fmt(edges[i+1])}cm" for i in range(len(edges) - 1)]
+
+
+def hour_labels(hour_step: int) -> list[str]:
+    starts = range(0, 24, hour_step)
+    return [f"{s}–{min(s + hour_step, 24)}時" for s in starts]
+
+
+def tide_hour_grid(tide: np.ndarray,
+                   hour: np.ndarray,
+                   size: np.ndarray,
+                   *,
+                   tide_step: float = DEFAULT_TIDE_STEP_CM,
+                   tide_max: float = DEFAULT_TIDE_MAX_CM,
+                   hour_step: int = DEFAULT_HOUR_STEP,
+                   metric: str = "count") -> pd.DataFrame:
+    """
+    潮位帯(行) × 時間帯(列) の表。tide は cm（tide_cm の戻り値）、hour は hours の戻り値、size は cm。
+    潮位・時刻が無効な行は除外する。count / mean / max は釣れた（size > 0）行だけ、
+    catch_rate は有効な全行に対する釣れた割合（%）。値のないセルは count が 0、それ以外は NaN。
+    """
+    if metric not in METRICS:
+        raise ValueError(f"unknown metric: {metric}")
+    if tide_step <= 0 or tide_max <= 0 or hour_step <= 0:
+        raise ValueError("tide_step, tide_max, hour_step は正の値にしてください")
+
+    t_labels, h_labels = tide_labels(tide_step, tide_max), hour_labels(hour_step)
+    nt, nh = len(t_labels), len(h_labels)
+    n = nt * nh
+
+    ok = (hour >= 0) & ~np.isnan(tide)
+    # 0 未満は最初のビン、上限以上は最後のビンに“丸める”（左閉右開 [a,b)）
+    tb = np.minimum(np.maximum(tide[ok], 0) // tide_step, nt - 1).astype(np.intp)
+    flat = tb * nh + hour[ok] // hour_step
+    s = np.nan_to_num(size[ok].astype(float), nan=0.0)
+    caught = s > 0
+
+    catches = np.bincount(flat, weights=caught, minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if metric == "count":
+            grid = catches
+        elif metric == "mean":
+            grid = np.bincount(flat, weights=np.where(caught, s, 0.0), minlength=n) / catches
+        elif metric == "max":
+            grid = np.full(n, -np.inf)
+            np.maximum.at(grid, flat[caught], s[caught])
+            grid[np.isneginf(grid)] = np.nan
+        else:  # catch_rate
+            grid = catches / np.bincount(flat, minlength=n) * 100
+
+    return pd.DataFrame(
+        grid.reshape(nt, nh),
+        index=pd.Index(t_labels, name="潮位帯"),
+        columns=pd.Index(h_labels, name="時間帯"),
+    )
@@ -0,0 +1,300 @@
+# tide_store.py
+"""
+tide736 の潮位系列のストア。
+
+tide736 の get_tide.php は rg=month で1か月分をまとめて返せるので、1港 × 1か月 = 1リクエストで取り、
+日ごとの系列を「時刻（0時からの分, int16）」と「潮位（cm, float32）」の配列にして SQLite（STORE_PATH）に保存する。
+推算潮位は後から変わらないので期限はなく、保存量が MAX_BYTES を超えたら最後に使ったのが古い日から消す。
+
+1年 × 9港の取り込みは 12 × 9 = 108 リクエスト：
+
+    python -m tide_store --start 2024-01-01 --end 2024-12-31
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date as Date, timedelta
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+import numpy as np
+import requests
+
+import http_client
+from perf import timed
+
+logger = logging.getLogger(__name__)
+
+TIDE736_URL = "https://api.tide736.net/get_tide.php"
+STORE_PATH = "tide_store.db"
+MAX_BYTES = 8 * 1024 * 1024   # 1日 ≒ 73点 × 6 bytes なので、9港 × 数年分は入る
+PREFETCH_WORKERS = 2          # tide736 への同時リクエスト数（http_client の上限と同じ）
+
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_month_locks: dict[tuple[int, int, int, int], list] = {}  # (港, 年, 月) → [ロック, 使っているスレッド数]
+_stats = {"hits": 0, "misses": 0, "requests": 0, "evicted_days": 0}
+
+
+class TideDay(NamedTuple):
+    minutes: np.ndarray   # int16：0時からの分（昇順）
+    cm: np.ndarray        # float32：潮位(cm)
+
+
+def _db() -> sqlite3.Connection:
+    """_lock を持った状態で呼ぶ"""
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(STORE_PATH, check_same_thread=False)
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tide_days (
+                    pc        INTEGER NOT NULL,
+                    hc        INTEGER NOT NULL,
+                    date      TEXT NOT NULL,
+                    minutes   BLOB NOT NULL,
+                    cm        BLOB NOT NULL,
+                    bytes     INTEGER NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (pc, hc, date)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tide_days_last_used ON tide_days (last_used)")
+        _conn = conn
+    return _conn
+
+
+def _decode(minutes: bytes, cm: bytes) -> TideDay:
+    return TideDay(np.frombuffer(minutes, dtype=np.int16), np.frombuffer(cm, dtype=np.float32))
+
+
+def parse_chart(chart: dict) -> dict[str, TideDay]:
+    """tide736 のレスポンスの tide.chart（日付 → {"tide": [{"time": "HH:MM", "cm": …}, …]}）→ 日付 → TideDay"""
+    out = {}
+    for day, c in chart.items():
+        pts = sorted(c.get("tide") or [], key=lambda p: p["time"])
+        if not pts:
+            continue
+        minutes = np.array([int(p["time"][:2]) * 60 + int(p["time"][3:5]) for p in pts], dtype=np.int16)
+        cm = np.array([float(p["cm"]) for p in pts], dtype=np.float32)
+        out[day] = TideDay(minutes, cm)
+    return out
+
+
+@timed("tide736.fetch_month", "api")
+def fetch_month(pc: int, hc: int, year: int, month: int) -> dict[str, TideDay]:
+    """1港の1か月分を1リクエストで取る"""
+    params = {"pc": pc, "hc": hc, "yr": year, "mn": month, "dy": 1, "rg": "month"}
+    data = http_client.get_json(TIDE736_URL, params=params, timeout=20)
+    if data.get("status") != 1:
+        raise ValueError(f"tide736 API error: {data.get('message')}")
+    with _lock:
+        _stats["requests"] += 1
+    return parse_chart(data["tide"]["chart"])
+
+
+def _save(pc: int, hc: int, days: dict[str, TideDay]) -> None:
+    now = time.time()
+    rows = [
+        (pc, hc, day, d.minutes.astype(np.int16).tobytes(), d.cm.astype(np.float32).tobytes(),
+         d.minutes.nbytes + d.cm.nbytes, now)
+        for day, d in days.items()
+    ]
+    with _lock:
+        conn = _db()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO tide_days (pc, hc, date, minutes, cm, bytes, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            # 新しく使った順に積み上げて MAX_BYTES を超えた分を消す
+            cur = conn.execute("""
+                DELETE FROM tide_days WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, SUM(bytes) OVER (ORDER BY last_used DESC, rowid DESC) AS acc FROM tide_days
+                    ) WHERE acc > ?
+                )
+            """, (MAX_BYTES,))
+            _stats["evicted_days"] += cur.rowcount
+
+
+def _load(pc: int, hc: int, day: str) -> Optional[TideDay]:
+    with _lock:
+        conn = _db()
+        r = conn.execute(
+            "SELECT minutes, cm FROM tide_days WHERE pc = ? AND hc = ? AND date = ?", (pc, hc, day)
+        ).fetchone()
+        if r is None:
+            return None
+        with conn:
+            conn.execute(
+                "UPDATE tide_days SET last_used = ? WHERE pc = ? AND hc = ? AND date = ?", (time.time(), pc, hc, day)
+            )
+    return _decode(*r)
+
+
+@contextmanager
+def _month_lock(pc: int, hc: int, year: int, month: int) -> Iterator[None]:
+    """同じ月の取得を1本にまとめるロック。使い終わって待っている人もいなければ辞書から消す"""
+    key = (pc, hc, year, month)
+    with _lock:
+        entry = _month_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _month_locks[key]
+
+
+def _fetch_and_save(pc: int, hc: int, year: int, month: int) -> bool:
+    """1か月分を取って保存する。取れなかったらログに残して False（_month_lock を持った状態で呼ぶ）"""
+    try:
+        _save(pc, hc, fetch_month(pc, hc, year, month))
+        return True
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logger.warning("潮位を取得できませんでした (pc=%s, hc=%s, %04d-%02d): %s", pc, hc, year, month, e)
+        return False
+
+
+def get_day(pc: int, hc: int, target_date: Date) -> TideDay:
+    """1日分の系列。無ければその月をまとめて取ってくる（同じ月を同時に取りに行くのは1回だけ）"""
+    day = target_date.strftime("%Y-%m-%d")
+    d = _load(pc, hc, day)
+    if d is None:
+        with _month_lock(pc, hc, target_date.year, target_date.month):
+            d = _load(pc, hc, day)
+            if d is None:
+                days = fetch_month(pc, hc, target_date.year, target_date.month)
+                _save(pc, hc, days)
+                d = days.get(day)
+        with _lock:
+            _stats["misses"] += 1
+        if d is None:
+            raise ValueError(f"tide data not found: {day}")
+    else:
+        with _lock:
+            _stats["hits"] += 1
+    return d
+
+
+def get_days(pc: int, hc: int, days: Iterable[str]) -> dict[str, TideDay]:
+    """
+    複数日（"YYYY-MM-DD"）をまとめて読む。保存されていない日はその月を取ってくる。
+    取れなかった日（月の取得に失敗したときも）は戻り値に入らない
+    """
+    want = sorted(set(days))
+    found: dict[str, TideDay] = {}
+
+    def _read(keys: list[str]) -> None:
+        with _lock:
+            conn = _db()
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                ph = ", ".join("?" for _ in chunk)
+                for day, minutes, cm in conn.execute(
+                    f"SELECT date, minutes, cm FROM tide_days WHERE pc = ? AND hc = ? AND date IN ({ph})",
+                    (pc, hc, *chunk),
+                ):
+                    found[day] = _decode(minutes, cm)
+            with conn:
+                conn.executemany(
+                    "UPDATE tide_days SET last_used = ? WHERE pc = ? AND hc = ? AND date = ?",
+                    [(time.time(), pc, hc, d) for d in keys if d in found],
+                )
+
+    _read(want)
+    missing = [d for d in want if d not in found]
+    with _lock:
+        _stats["hits"] += len(want) - len(missing)
+        _stats["misses"] += len(missing)
+    for y, m in sorted({(int(d[:4]), int(d[5:7])) for d in missing}):
+        with _month_lock(pc, hc, y, m):
+            if _stored_days(pc, hc, y, m) < _days_in_month(y, m):
+                _fetch_and_save(pc, hc, y, m)
+    if missing:
+        _read(missing)
+    return found
+
+
+def _months(start: Date, end: Date) -> list[tuple[int, int]]:
+    out, y, m = [], start.year, start.month
+    while (y, m) <= (end.year, end.month):
+        out.append((y, m))
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
+def _days_in_month(year: int, month: int) -> int:
+    nxt = Date(year + 1, 1, 1) if month == 12 else Date(year, month + 1, 1)
+    return (nxt - timedelta(days=1)).day
+
+
+def _stored_days(pc: int, hc: int, year: int, month: int) -> int:
+    with _lock:
+        return _db().execute(
+            "SELECT COUNT(*) FROM tide_days WHERE pc = ? AND hc = ? AND date LIKE ?",
+            (pc, hc, f"{year:04d}-{month:02d}-%"),
+        ).fetchone()[0]
+
+
+class PrefetchResult(NamedTuple):
+    fetched: int   # 取り込めた月の数（= 成功したリクエスト数）
+    failed: int    # 取得に失敗した月の数（ログに残して次の月へ進む）
+
+
+def prefetch(ports: Iterable[tuple[int, int]], start: Date, end: Date) -> PrefetchResult:
+    """
+    start〜end を含む月を、港ごと・月ごとに1リクエストで取り込む（保存済みの月は飛ばす）。
+    1か月の失敗で全体は止めない
+    """
+    todo = [
+        (pc, hc, y, m)
+        for pc, hc in ports
+        for y, m in _months(start, end)
+        if _stored_days(pc, hc, y, m) < _days_in_month(y, m)
+    ]
+
+    def _one(job) -> Optional[bool]:
+        pc, hc, y, m = job
+        with _month_lock(pc, hc, y, m):
+            if _stored_days(pc, hc, y, m) < _days_in_month(y, m):
+                return _fetch_and_save(pc, hc, y, m)
+        return None  # 待っている間に他が取り込んだ
+
+    with ThreadPoolExecutor(max_workers=PREFETCH_WORKERS) as pool:
+        done = list(pool.map(_one, todo))
+    return PrefetchResult(fetched=done.count(True), failed=done.count(False))
+
+
+def store_stats() -> dict:
+    with _lock:
+        days, size = _db().execute("SELECT COUNT(*), IFNULL(SUM(bytes), 0) FROM tide_days").fetchone()
+        return {"days": days, "bytes": size, "max_bytes": MAX_BYTES, **_stats}
+
+
+def main(argv: list[str] | None = None) -> None:
+    from tide736 import TIDE736_PORTS
+
+    ap = argparse.ArgumentParser(description="tide736 の潮位を港ごと・月ごとにまとめて取り込む")
+    ap.add_argument("--start", type=Date.fromisoformat, required=True)
+    ap.add_argument("--end", type=Date.fromisoformat, required=True)
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    res = prefetch([(p["pc"], p["hc"]) for p in TIDE736_PORTS.values()], args.start, args.end)
+    print(f"{res.fetched} か月分を取り込み / 失敗 {res.failed} / {time.perf_counter() - t0:.1f} 秒 / {store_stats()}")
+    if res.failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()